@@ -0,0 +1,100 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from search_game.mapgen import add_map_arguments, load_grid
+from search_game.neighborhood import WALKABLE, Connectivity
+from search_game.tiled_wavefront import (
+    DEFAULT_DEPTH,
+    DEFAULT_TILE_SIZE,
+    TiledWavefront,
+)
+from search_game.wavefront import Wavefront
+
+
+def best_time(search, repeat: int) -> float:
+    """fastest of repeat runs of search, in seconds"""
+    times = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        search()
+        times.append(time.perf_counter() - began)
+    return min(times)
+
+
+def count_mismatches(
+    tiled: TiledWavefront, wavefront: Wavefront, connectivity: Connectivity
+) -> int:
+    """cells where the tiled search disagrees with the sequential one
+
+    distances have to be equal, and every reached cell that is not a source needs a
+    parent one level closer that it can be reached from in a single move
+    """
+
+    neighborhood = wavefront.neighborhood
+    reached = wavefront.stamps == wavefront.epoch
+    distances = np.where(reached, wavefront.distances, -1)
+    tiled_distances = tiled.layers.distances
+    mismatches = int(np.count_nonzero(distances != tiled_distances))
+
+    cells = np.flatnonzero(tiled_distances > 0)
+    parents = tiled.layers.parents[cells]
+    table = neighborhood.tables[connectivity]
+    legal = np.zeros(len(cells), dtype=bool)
+    for target, corner_a, corner_b in table.T:
+        corners = (
+            tiled.layers.flags[parents + corner_a]
+            & tiled.layers.flags[parents + corner_b]
+        )
+        legal |= (cells - parents == target) & ((corners & WALKABLE) != 0)
+    legal &= tiled_distances[parents] == tiled_distances[cells] - 1
+    return mismatches + int(np.count_nonzero(~legal))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="sequential against tiled multi process wavefront flood"
+    )
+    add_map_arguments(parser)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        help="worker counts to try, defaults to powers of two up to the core count",
+    )
+    parser.add_argument("--tile", type=int, default=DEFAULT_TILE_SIZE)
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument(
+        "--connectivity",
+        choices=[connectivity.name for connectivity in Connectivity],
+        default=Connectivity.FOUR.name,
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cores = len(os.sched_getaffinity(0))
+    workers = args.workers or [1 << i for i in range(cores.bit_length())]
+    connectivity = Connectivity[args.connectivity]
+    grid = load_grid(args)
+    # a map loaded with --map has no start, flood from its first open cell instead
+    sources = grid.source_points() or [tuple(np.argwhere(grid.walkable_mask())[0])]
+    print(f"{grid.grid_width}x{grid.grid_height} grid, {cores} cores")
+
+    wavefront = Wavefront(grid.neighborhood)
+    sequential = best_time(
+        lambda: wavefront.search(sources, None, connectivity), args.repeat
+    )
+    print(f"sequential: {sequential:.3f}s")
+
+    for count in workers:
+        with TiledWavefront(grid.neighborhood, count, args.tile, args.depth) as tiled:
+            elapsed = best_time(
+                lambda: tiled.search(sources, connectivity), args.repeat
+            )
+            mismatches = count_mismatches(tiled, wavefront, connectivity)
+        print(
+            f"{count} workers: {elapsed:.3f}s  speedup {sequential / elapsed:.2f}x"
+            f"  {'ok' if mismatches == 0 else f'{mismatches} mismatched cells'}"
+        )
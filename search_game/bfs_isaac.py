@@ -1,11 +1,11 @@
 from typing import Optional
 
 from search_game.constants import GLOW_FADE_DURATION
-from search_game.grid import CellState, Grid, Path
+from search_game.grid import Grid, Path
 
 
 def trace_path(grid: Grid, end_pos: tuple[int, int]) -> Path:
-    """trace the path from the end to the start using the grid.get_parent(pos) method
+    """trace the path from the end back to whichever start it was reached from
 
     Parameters
     ----------
@@ -23,7 +23,7 @@ def trace_path(grid: Grid, end_pos: tuple[int, int]) -> Path:
     """
 
     path = [end_pos]
-    while path[-1] != grid.start_point:
+    while not grid.sources[path[-1]]:
         print("tracing_path:", path[-1])
         parent_pos = grid.parents[path[-1]]
         parent_pos = tuple(parent_pos)
@@ -49,24 +49,29 @@ def visit_grid_cell(grid: Grid, parent_pos, visited_pos):
         if the cell has already been visited
     """
 
-    parent_path = grid.parents[visited_pos]
-    if parent_path[0] != -1:
+    if grid.is_visited(visited_pos):
+        parent_path = grid.parents[visited_pos]
         raise ValueError(
             f"Already visited cell at {visited_pos} with parent {parent_path}"
         )
     grid.parents[visited_pos] = parent_pos
     grid.glows[visited_pos] = GLOW_FADE_DURATION
+    grid.neighborhood.visit(visited_pos)
 
 
 def bfs_isaac(grid: Grid) -> Optional[Path]:
     """breadth-first search algorithm only make one step per call!
 
+    every start is seeded by grid.init_queue and the search stops at the first
+    end it reaches
+
     Parameters
     ----------
     grid : Grid
         grid that contains state of the grid
-        use grid.get_cell(x, y) to get the state of the cell
-        use grid.visit(parent_x, parent_y, x, y) to visit a cell
+        use grid.neighborhood.open_neighbors(pos, grid.connectivity) to get the
+        walkable unvisited neighbors of a cell
+        use visit_grid_cell(grid, parent_pos, pos) to visit a cell
         use grid.bfs_queue as the queue for the bfs algorithm
 
     Returns
@@ -79,19 +84,11 @@ def bfs_isaac(grid: Grid) -> Optional[Path]:
         return None
 
     parent_pos = grid.bfs_queue.pop(0)
-    left_neighbor = (parent_pos[0] - 1, parent_pos[1])
-    right_neighbor = (parent_pos[0] + 1, parent_pos[1])
-    up_neighbor = (parent_pos[0], parent_pos[1] - 1)
-    down_neighbor = (parent_pos[0], parent_pos[1] + 1)
-    neighbors = [left_neighbor, right_neighbor, up_neighbor, down_neighbor]
-
-    valid_neighbors = filter(
-        lambda x: grid.get_cell(x) in [CellState.Path, CellState.End], neighbors
-    )
+    valid_neighbors = grid.neighborhood.open_neighbors(parent_pos, grid.connectivity)
 
     for neighbor in valid_neighbors:
         visit_grid_cell(grid, parent_pos, neighbor)
-        if neighbor == grid.end_point:
+        if grid.goals[neighbor]:
             return trace_path(grid, neighbor)
         grid.bfs_queue.append(neighbor)
 
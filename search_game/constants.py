@@ -35,6 +35,8 @@ END_COLOR = pygame.Color(255, 0, 0)
 WALKED_COLOR = pygame.Color(0, 0, 255)
 VISITED_COLOR = pygame.Color(255, 255, 0, 128)
 ARROW_COLOR = pygame.Color(255, 0, 0)
+TOOL_ICON_COLOR = pygame.Color(128, 128, 128)
+SELECTED_TOOL_COLOR = pygame.Color(255, 255, 255)
 
 DEFAULT_COLOR_PALLETTE = [PATH_COLOR, START_COLOR, END_COLOR]
 
@@ -45,6 +47,8 @@ INITIAL_WINDOW_CAPTION = "Pathfinding"
 DEFAULT_FPS = 60
 
 PATHFIND_TICK = 0.05  # in seconds
+HPA_CLUSTER_SIZE = 10  # in grid units
+MAX_HEURISTIC_GOALS = 16  # above this A* drops the min distance to goal heuristic
 
 
 def init():
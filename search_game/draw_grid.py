@@ -1,23 +1,37 @@
+from enum import Enum
 from typing import override
 
 import pygame
 
+from search_game import mapgen
 from search_game.constants import (
     DEFAULT_COLOR_PALLETTE,
     END_COLOR,
     GRID_SCALE,
     PATH_COLOR,
     PATH_PAINTBRUSH_SIZE,
+    SELECTED_TOOL_COLOR,
     START_COLOR,
+    TOOL_ICON_COLOR,
     UI_GRID_SCALE,
     WALL_COLOR,
     render_text,
 )
 from search_game.gameobject import GameObject
 from search_game.global_state import GLOBAL_STATE
+from search_game.journal import EditJournal
 from search_game.renderable import Renderable, RenderLayer
 
+
+class PlacementTool(Enum):
+    BRUSH = 0
+    BUCKET = 1
+
+
 placement_color = PATH_COLOR
+placement_tool = PlacementTool.BRUSH
+map_kind = mapgen.MapKind.MAZE
+map_seed = 0
 
 DEFAULT_PLACEMENT_COLOR_UI_POS = (20, 20)
 DEFAULT_PLACEMENT_COLOR_UI_TEXT = "Current:"
@@ -67,12 +81,25 @@ class CurrentPlacementColorDisplay(Renderable):
 class PlacementColorPalette(Renderable, GameObject):
     colors: list[pygame.Color]
     rects: list[pygame.Rect]
+    tools: list[PlacementTool]
+    tool_rects: list[pygame.Rect]
     text_surface: pygame.Surface
 
     def render(self, screen: pygame.Surface):
         screen.blit(self.text_surface, DEFAULT_PLACEMENT_COLOR_PALETTE_UI_POS)
         for rect, color in zip(self.rects, self.colors):
             pygame.draw.rect(screen, color, rect)
+        for rect, tool in zip(self.tool_rects, self.tools):
+            self.render_tool(screen, rect, tool)
+
+    @staticmethod
+    def render_tool(screen: pygame.Surface, rect: pygame.Rect, tool: PlacementTool):
+        if tool == PlacementTool.BRUSH:
+            pygame.draw.circle(screen, TOOL_ICON_COLOR, rect.center, rect.width // 3)
+        else:
+            pygame.draw.rect(screen, TOOL_ICON_COLOR, rect.inflate(-4, -4))
+        if tool == placement_tool:
+            pygame.draw.rect(screen, SELECTED_TOOL_COLOR, rect, width=2)
 
     def update(self):
         if GLOBAL_STATE.any_event(pygame.MOUSEBUTTONDOWN):
@@ -85,6 +112,10 @@ class PlacementColorPalette(Renderable, GameObject):
             if rect.collidepoint(pos):
                 global placement_color
                 placement_color = color
+        for rect, tool in zip(self.tool_rects, self.tools):
+            if rect.collidepoint(pos):
+                global placement_tool
+                placement_tool = tool
 
     def __init__(
         self,
@@ -93,21 +124,21 @@ class PlacementColorPalette(Renderable, GameObject):
         text_surface: pygame.Surface,
     ):
         self.colors = colors
+        self.tools = list(PlacementTool)
         self.text_surface = text_surface
-        self.rects = list(
-            map(
-                lambda x: pygame.Rect(
-                    pos[0]
-                    + text_surface.get_width()
-                    + DEFAULT_PLACEMENT_COLOR_OFFSET[0]
-                    + x * (UI_GRID_SCALE + DEFAULT_PALLETE_MARGIN),
-                    pos[1] + DEFAULT_PLACEMENT_COLOR_OFFSET[1],
-                    UI_GRID_SCALE,
-                    UI_GRID_SCALE,
-                ),
-                range(len(colors)),
-            )
+        slot_rect = lambda x: pygame.Rect(
+            pos[0]
+            + text_surface.get_width()
+            + DEFAULT_PLACEMENT_COLOR_OFFSET[0]
+            + x * (UI_GRID_SCALE + DEFAULT_PALLETE_MARGIN),
+            pos[1] + DEFAULT_PLACEMENT_COLOR_OFFSET[1],
+            UI_GRID_SCALE,
+            UI_GRID_SCALE,
         )
+        self.rects = list(map(slot_rect, range(len(colors))))
+        # leave one empty slot between the colors and the tools
+        tool_slots = range(len(colors) + 1, len(colors) + 1 + len(self.tools))
+        self.tool_rects = list(map(slot_rect, tool_slots))
 
     @staticmethod
     def default() -> "PlacementColorPalette":
@@ -139,6 +170,14 @@ def paint_blob(pos: pygame.Vector2, color: pygame.Color, radius: float):
         GLOBAL_STATE.grid.place_square(grid_pos, color)
 
 
+def fill(pos: pygame.Vector2, color: pygame.Color):
+    grid_pos = GLOBAL_STATE.grid.screen_to_grid(pos)
+    if grid_pos is None:
+        return
+    GLOBAL_STATE.grid.fill_region(grid_pos, color)
+    GLOBAL_STATE.grid.journal.commit()
+
+
 def paint(pos1: pygame.Vector2, color: pygame.Color):
     if color in [START_COLOR, END_COLOR]:
         paint_point(pos1, color)
@@ -158,7 +197,33 @@ def handle_right_mouse():
     paint(pos, WALL_COLOR)
 
 
+def bucket_fill_loop():
+    # fill once per click instead of every frame the button is held
+    for event in GLOBAL_STATE.filter_events(pygame.MOUSEBUTTONDOWN):
+        pos = pygame.Vector2(event.pos)
+        if event.button == pygame.BUTTON_LEFT:
+            fill(pos, placement_color)
+        elif event.button == pygame.BUTTON_RIGHT:
+            fill(pos, WALL_COLOR)
+
+
+def generate_map_loop():
+    # every press generates the next kind of map with a fresh seed
+    if not GLOBAL_STATE.key_event(pygame.KEYDOWN, pygame.K_g):
+        return
+    global map_kind, map_seed
+    mapgen.generate(GLOBAL_STATE.grid, map_kind, map_seed)
+    GLOBAL_STATE.grid.journal.commit()
+    print(f"Generated {map_kind.name} map with seed {map_seed}")
+    map_kind = map_kind.next()
+    map_seed += 1
+
+
 def create_grid_loop():
+    if placement_tool == PlacementTool.BUCKET:
+        bucket_fill_loop()
+        return
+
     # mouse buttons in order of (left, wheel, right)
     pressed_tuple = pygame.mouse.get_pressed()
 
@@ -166,9 +231,20 @@ def create_grid_loop():
         handle_left_mouse()
     if pressed_tuple[2]:
         handle_right_mouse()
+    if not pressed_tuple[0] and not pressed_tuple[2]:
+        # a brush stroke lasts as long as a button is held
+        GLOBAL_STATE.grid.journal.commit()
+
+
+def undo_loop():
+    if GLOBAL_STATE.key_event(pygame.KEYDOWN, pygame.K_z):
+        GLOBAL_STATE.grid.undo()
+    if GLOBAL_STATE.key_event(pygame.KEYDOWN, pygame.K_y):
+        GLOBAL_STATE.grid.redo()
 
 
 def init():
+    GLOBAL_STATE.grid.journal = EditJournal()
     default_placement_color_ui = CurrentPlacementColorDisplay.default()
     default_color_palette_ui = PlacementColorPalette.default()
     GLOBAL_STATE.game_objects.append(default_color_palette_ui)
@@ -0,0 +1,232 @@
+import argparse
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from math import floor
+from typing import Optional
+
+import numpy as np
+import pygame
+
+from search_game import constants, gameglobals, mapgen, pathfinder
+from search_game.constants import (
+    DEFAULT_FPS,
+    PATHFIND_TICK,
+    SCREEN_HEIGHT,
+    SCREEN_WIDTH,
+)
+from search_game.global_state import GLOBAL_STATE, Gamemode
+from search_game.grid import Grid
+from search_game.main import init_callbacks
+
+DEFAULT_EXPORT_DIRECTORY = "frames"
+DEFAULT_BACKLOG = 64  # frames waiting to be written before rendering blocks
+FRAME_NAME = "frame_{:06d}.png"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_COMPRESSION = 6  # zlib level
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(kind + data)
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+
+def encode_png(pixels: bytes, size: tuple[int, int]) -> bytes:
+    """RGB pixels as returned by pygame.image.tobytes encoded as a PNG file
+
+    pygame.image.save holds the GIL while it encodes, zlib lets go of it, so encoding
+    here actually runs alongside the rendering thread
+    """
+    width, height = size
+    rows = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width * 3)
+    # every row starts with its filter type, 0 stores the row as is
+    filtered = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    filtered[:, 1:] = rows
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)  # 8 bit RGB
+    data = zlib.compress(filtered.tobytes(), PNG_COMPRESSION)
+    return (
+        PNG_SIGNATURE
+        + png_chunk(b"IHDR", header)
+        + png_chunk(b"IDAT", data)
+        + png_chunk(b"IEND", b"")
+    )
+
+
+def frame_limit(grid: Grid, dt: float) -> int:
+    """most frames a search of grid and drawing its path can take at dt per frame
+
+    a search step runs once per pathfind tick and visits at least one cell, so there
+    are never more steps than walkable cells, the path is then drawn a cell a frame
+    """
+    cells = int(grid.walkable_mask().sum())
+    # the ticker fires on the first frame past the tick, one more covers rounding
+    frames_per_step = floor(PATHFIND_TICK / dt) + 2
+    return (cells + 1) * frames_per_step + cells
+
+
+class FrameWriter:
+    """writes frames as a numbered PNG sequence from a background thread
+
+    submit only copies the pixels out of the surface, the encoding and the file writes
+    happen on the writer thread so they overlap with rendering the next frames
+    """
+
+    directory: str
+    frames: queue.Queue
+    thread: threading.Thread
+    count: int  # frames submitted so far
+    error: Optional[BaseException]  # first failure of the writer thread
+
+    def __init__(self, directory: str, backlog: int = DEFAULT_BACKLOG):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.frames = queue.Queue(maxsize=backlog)
+        self.count = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def __enter__(self) -> "FrameWriter":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def submit(self, screen: pygame.Surface):
+        """queue the current contents of screen as the next frame
+
+        blocks while the backlog is full, so rendering never runs far ahead of the disk
+        """
+        if self.error is not None:
+            raise self.error
+        pixels = pygame.image.tobytes(screen, "RGB")
+        self.frames.put((self.count, pixels, screen.get_size()))
+        self.count += 1
+
+    def run(self):
+        while (frame := self.frames.get()) is not None:
+            # after a failure keep draining so submit never blocks forever
+            if self.error is not None:
+                continue
+            index, pixels, size = frame
+            try:
+                path = os.path.join(self.directory, FRAME_NAME.format(index))
+                with open(path, "wb") as file:
+                    file.write(encode_png(pixels, size))
+            except BaseException as error:
+                self.error = error
+
+    def close(self):
+        """wait for every submitted frame to be written"""
+        self.frames.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+def export_search(
+    directory: str,
+    kind: mapgen.MapKind,
+    seed: int,
+    dt: float = 1 / DEFAULT_FPS,
+    max_frames: Optional[int] = None,
+) -> int:
+    """play a search on a generated map offscreen and write every frame
+
+    each frame advances the game by exactly dt and nothing waits on a clock, so the
+    export runs as fast as rendering allows and the same arguments always give the
+    same frames
+
+    Parameters
+    ----------
+    directory : str
+        where the PNG sequence is written
+    kind : mapgen.MapKind
+        generator of the map to search
+    seed : int
+        seed of the generator
+    dt : float
+        simulated seconds per frame
+    max_frames : Optional[int]
+        stop after this many frames even if the path was not drawn yet, defaults to
+        frame_limit of the generated map, which every search finishes within
+
+    Returns
+    -------
+    int
+        the number of frames written
+
+    Raises
+    ------
+    ValueError
+        if the generated map has no start or no end
+    """
+
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    GLOBAL_STATE.init(
+        init_callbacks=init_callbacks,
+        main_loop=pathfinder.DRAW_LOOP,
+        screen=screen,
+    )
+    grid = GLOBAL_STATE.grid
+    mapgen.generate(grid, kind, seed)
+    GLOBAL_STATE.set_gamemode(Gamemode.PLAY, pathfinder.PATHFIND_LOOP)
+    if GLOBAL_STATE.gamemode != Gamemode.PLAY:
+        raise ValueError("Map has no start or no end to search between")
+
+    # the pathfind ticker lives on in the module, start it fresh like a new game
+    pathfinder.pathfind_ticker.seconds = 0
+    pathfinder.pathfind_counter = 0
+    gameglobals.dt = dt
+    if max_frames is None:
+        max_frames = frame_limit(grid, dt)
+    done = False
+    with FrameWriter(directory) as writer:
+        while not done and writer.count < max_frames:
+            GLOBAL_STATE.step()
+            writer.submit(screen)
+            path = grid.found_path
+            done = path is not None and grid.path_render_iter == len(path)
+    if not done:
+        print(f"Warning: stopped at {max_frames} frames before the path was drawn")
+    return writer.count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="render a search offscreen to a PNG sequence"
+    )
+    parser.add_argument("--out", default=DEFAULT_EXPORT_DIRECTORY)
+    parser.add_argument(
+        "--kind",
+        choices=[kind.name for kind in mapgen.MapKind],
+        default=mapgen.MapKind.MAZE.name,
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--dt", type=float, default=1 / DEFAULT_FPS, help="simulated seconds per frame"
+    )
+    parser.add_argument(
+        "--frames",
+        type=int,
+        help="stop after this many frames, defaults to enough for any search",
+    )
+    args = parser.parse_args()
+
+    # never open a window, everything is drawn to an offscreen surface
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    constants.init()
+    began = time.perf_counter()
+    frames = export_search(
+        args.out, mapgen.MapKind[args.kind], args.seed, args.dt, args.frames
+    )
+    elapsed = time.perf_counter() - began
+    print(
+        f"Wrote {frames} frames to {args.out} in {elapsed:.2f}s"
+        f" ({frames / elapsed:.0f} frames/s)"
+    )
+    pygame.quit()
@@ -0,0 +1,79 @@
+import numpy as np
+
+
+def run_labels(same: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """label the runs of True along the last axis of a 2d mask
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        flat label of every cell (-1 outside the mask), flat start and length of every run
+    """
+
+    flat = same.reshape(-1)
+    run_starts = same.copy()
+    run_starts[:, 1:] &= ~same[:, :-1]
+    run_starts = run_starts.reshape(-1)
+    labels = np.cumsum(run_starts, dtype=np.int64) - 1
+    labels[~flat] = -1
+    starts = np.flatnonzero(run_starts)
+    run_ends = same.copy()
+    run_ends[:, :-1] &= ~same[:, 1:]
+    lengths = np.flatnonzero(run_ends.reshape(-1)) - starts + 1
+    return labels, starts, lengths
+
+
+def run_cells(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """flat indices of every cell covered by the given runs"""
+    offsets = np.cumsum(lengths) - lengths
+    steps = np.arange(lengths.sum()) - np.repeat(offsets, lengths)
+    return np.repeat(starts, lengths) + steps
+
+
+def connected_region(same: np.ndarray, pos: tuple[int, int]) -> np.ndarray:
+    """4-connected region of same that contains pos
+
+    instead of visiting cells one by one, whole runs of the mask are claimed at once,
+    alternating between the runs along y and the runs along x until no new run is hit,
+    so the work is proportional to the region and the loop count to its number of turns
+
+    Parameters
+    ----------
+    same : np.ndarray
+        (width, height) mask of the cells that may be part of the region
+    pos : tuple[int, int]
+        a cell inside the mask to grow the region from
+
+    Returns
+    -------
+    np.ndarray
+        (width, height) mask of the region, all False if pos is outside the mask
+    """
+
+    width, height = same.shape
+    region = np.zeros_like(same)
+    if not same[pos]:
+        return region
+
+    y_labels, y_starts, y_lengths = run_labels(same)
+    x_labels, x_starts, x_lengths = run_labels(np.ascontiguousarray(same.T))
+    reached_y = np.zeros(len(y_starts), dtype=bool)
+    reached_x = np.zeros(len(x_starts), dtype=bool)
+
+    new_y = y_labels[[pos[0] * height + pos[1]]]
+    reached_y[new_y] = True
+    while len(new_y):
+        cells = run_cells(y_starts[new_y], y_lengths[new_y])
+        xs, ys = np.divmod(cells, height)
+        new_x = np.unique(x_labels[ys * width + xs])
+        new_x = new_x[~reached_x[new_x]]
+        reached_x[new_x] = True
+
+        cells = run_cells(x_starts[new_x], x_lengths[new_x])
+        ys, xs = np.divmod(cells, width)
+        new_y = np.unique(y_labels[xs * height + ys])
+        new_y = new_y[~reached_y[new_y]]
+        reached_y[new_y] = True
+
+    region.reshape(-1)[run_cells(y_starts[reached_y], y_lengths[reached_y])] = True
+    return region
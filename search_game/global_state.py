@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Callable, Iterable
+from typing import Callable, Iterable, Optional
 
 import pygame
 
@@ -40,9 +40,13 @@ class GlobalState:
         init_callbacks: list[Callable] = [],
         main_loop: list[Callable] = [],
         gamemode: Gamemode = Gamemode.DRAW,
+        screen: Optional[pygame.Surface] = None,
     ):
+        """screen is where frames are drawn, the display window when None"""
         self.grid = Grid.default()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        if screen is None:
+            screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.screen = screen
         self.background_color = WALL_COLOR
         self.running = True
         self.init_callbacks = init_callbacks
@@ -71,10 +75,8 @@ class GlobalState:
             for renderable in render_list:
                 renderable.render(self.screen)
 
-    def update(self):
-        self.events = pygame.event.get()
-
-        self.quit_game_if_event()
+    def step(self):
+        """advance the game by one frame of gameglobals.dt and draw it to the screen"""
         self.render_bg()
         for callable in self.main_loop:
             callable()
@@ -83,6 +85,12 @@ class GlobalState:
             game_object.update()
 
         self.render_objects()
+
+    def update(self):
+        self.events = pygame.event.get()
+
+        self.quit_game_if_event()
+        self.step()
         self.last_frame_presses = pygame.mouse.get_pressed()
         self.last_frame_mouse_pos = pygame.Vector2(pygame.mouse.get_pos())
         pygame.display.flip()
@@ -1,6 +1,6 @@
 from enum import Enum
 from math import floor
-from typing import Optional
+from typing import Callable, Optional
 
 import numpy as np
 import pygame
@@ -24,6 +24,9 @@ from search_game.constants import (
     WALL_COLOR,
     glow_sample_curve,
 )
+from search_game.fill import connected_region
+from search_game.journal import EditJournal
+from search_game.neighborhood import Connectivity, Neighborhood
 from search_game.renderable import Renderable
 
 Path = list[tuple[int, int]]
@@ -46,6 +49,11 @@ class CellState(Enum):
         raise ValueError(f"Unknown grid color: {pygame_color}")
 
 
+def color_word(color) -> np.uint32:
+    """an RGBA color packed like a grid pixel viewed as a single uint32"""
+    return np.array(pygame.Color(color), dtype=np.uint8).view(np.uint32)[0]
+
+
 def draw_arrow(
     screen: pygame.Surface,
     color: pygame.Color,
@@ -76,6 +84,7 @@ def draw_arrow(
 class Grid(Renderable):
     grid: np.ndarray
     parents: np.ndarray  # matrix of 2d points to store the parent of each visited cell
+    costs: np.ndarray  # path cost from the start of each visited cell
     glows: np.ndarray
     scale: int
     grid_width: int
@@ -83,9 +92,16 @@ class Grid(Renderable):
     bounding_box: pygame.Rect
     found_path: Optional[Path]
     path_render_iter: int
-    start_point: Optional[tuple[int, int]]
-    end_point: Optional[tuple[int, int]]
+    sources: np.ndarray  # mask of the start cells
+    goals: np.ndarray  # mask of the end cells
     bfs_queue: list[tuple[int, int]]
+    search_heap: list[tuple[int, int, tuple[int, int]]]  # (estimate, cost, pos)
+    edit_listeners: list[Callable[[pygame.Rect], None]]
+    revision: int  # bumped by every edit so whole grid caches can spot staleness
+    neighborhood: Neighborhood
+    words: np.ndarray  # flat view of grid with each RGBA pixel as one uint32 word
+    journal: Optional[EditJournal]  # records edits for undo when set
+    connectivity: Connectivity
 
     def __init__(self, scale: int, bounding_box: pygame.Rect):
         self.scale = scale
@@ -93,18 +109,26 @@ class Grid(Renderable):
         grid_size = pygame.Vector2(bounding_box.size) // scale
         self.grid_width = floor(grid_size.x)
         self.grid_height = floor(grid_size.y)
-        self.start_point = None
-        self.end_point = None
         self.path_render_iter = 0
         self.found_path = None
         self.bfs_queue = []
+        self.search_heap = []
+        self.edit_listeners = []
+        self.revision = 0
+        self.neighborhood = Neighborhood(self.grid_width, self.grid_height)
+        self.connectivity = Connectivity.FOUR
         self.grid = np.zeros(
             shape=(self.grid_width, self.grid_height, COLORS),
             dtype=np.uint8,
         )
+        self.words = self.grid.view(np.uint32).reshape(-1)
+        self.journal = None
         self.parents = np.full(
             shape=(self.grid_width, self.grid_height, 2), dtype=np.int32, fill_value=-1
         )
+        self.costs = np.zeros(shape=(self.grid_width, self.grid_height), dtype=np.int32)
+        self.sources = np.zeros(shape=(self.grid_width, self.grid_height), dtype=bool)
+        self.goals = np.zeros(shape=(self.grid_width, self.grid_height), dtype=bool)
         self.glows = np.zeros(
             shape=(self.grid_width, self.grid_height), dtype=np.float32
         )
@@ -149,56 +173,124 @@ class Grid(Renderable):
     def place_square(self, pos: tuple[int, int], color: pygame.Color):
         if not self.in_bounds(pos):
             return
-        if color == START_COLOR and self.start_point:
-            self.grid[self.start_point] = PATH_COLOR
-
-        if color == END_COLOR and self.end_point:
-            self.grid[self.end_point] = PATH_COLOR
-
-        if color != START_COLOR and self.start_point == pos:
-            self.start_point = None
-
-        if color != END_COLOR and self.end_point == pos:
-            self.end_point = None
-
-        if color == START_COLOR:
-            self.start_point = pos
-
-        if color == END_COLOR:
-            self.end_point = pos
+        self.write_cells(np.array([pos[0] * self.grid_height + pos[1]]), color)
+        self.notify_edit(pygame.Rect(pos, (1, 1)))
+
+    def set_walkable(self, walkable: np.ndarray):
+        """replace the whole map with paths where walkable is set and walls elsewhere"""
+        walkable = walkable.reshape(-1)
+        self.write_cells(np.flatnonzero(~walkable), WALL_COLOR)
+        self.write_cells(np.flatnonzero(walkable), PATH_COLOR)
+        self.notify_edit(pygame.Rect(0, 0, self.grid_width, self.grid_height))
+
+    def fill_region(self, pos: tuple[int, int], color: pygame.Color):
+        """paint the 4-connected region of cells sharing the color of pos in one go"""
+        if not self.in_bounds(pos):
+            return
+        if color in [START_COLOR, END_COLOR]:
+            self.place_square(pos, color)
+            return
 
-        self.grid[pos] = color
-        print(f"{self.start_point=}, {self.end_point=}")
+        same = np.all(self.grid == self.grid[pos], axis=-1)
+        cells = np.flatnonzero(connected_region(same, pos))
+        self.write_cells(cells, color)
+        self.notify_edit(self.bounding_rect(cells))
+
+    def write_cells(self, cells: np.ndarray, color: pygame.Color):
+        """paint the flat cells, recording the words they had in the journal if any"""
+        word = color_word(color)
+        if self.journal is not None:
+            before = self.words[cells]
+            changed = before != word
+            after = np.full(np.count_nonzero(changed), word)
+            self.journal.record(cells[changed], before[changed], after)
+        self.words[cells] = word
+
+    def bounding_rect(self, cells: np.ndarray) -> pygame.Rect:
+        """smallest rect (in grid units) covering the non empty flat cells"""
+        xs, ys = np.divmod(cells, self.grid_height)
+        left, top = int(xs.min()), int(ys.min())
+        return pygame.Rect(left, top, int(xs.max()) - left + 1, int(ys.max()) - top + 1)
+
+    def undo(self) -> bool:
+        """take back the last stroke of the journal, False if there was none"""
+        return self.apply_stroke(self.journal and self.journal.undo())
+
+    def redo(self) -> bool:
+        """apply the last undone stroke of the journal again, False if there was none"""
+        return self.apply_stroke(self.journal and self.journal.redo())
+
+    def apply_stroke(self, stroke: Optional[tuple[np.ndarray, np.ndarray]]) -> bool:
+        # one scatter for the whole stroke, not journaled itself
+        if not stroke:
+            return False
+        cells, words = stroke
+        self.words[cells] = words
+        self.notify_edit(self.bounding_rect(cells))
+        return True
+
+    def notify_edit(self, rect: pygame.Rect):
+        """tell every edit listener that the cells inside rect (in grid units) changed"""
+        self.revision += 1
+        self.neighborhood.refresh(rect, self.walkable_mask(rect))
+        region = (slice(rect.left, rect.right), slice(rect.top, rect.bottom))
+        pixels = self.grid[region].view(np.uint32)[..., 0]
+        self.sources[region] = pixels == color_word(START_COLOR)
+        self.goals[region] = pixels == color_word(END_COLOR)
+        for listener in self.edit_listeners:
+            listener(rect)
+
+    def walkable_mask(self, rect: Optional[pygame.Rect] = None) -> np.ndarray:
+        """boolean mask of the non wall cells, optionally limited to rect (in grid units)"""
+        cells = self.grid
+        if rect is not None:
+            cells = cells[rect.left : rect.right, rect.top : rect.bottom]
+        return cells.view(np.uint32)[..., 0] != color_word(WALL_COLOR)
 
     def get_cell(self, pos: tuple[int, int]) -> CellState:
         if not self.in_bounds(pos):
             return CellState.Wall
-        parent_pos = self.parents[pos]
-        if parent_pos[0] != -1:
+        if self.is_visited(pos):
             return CellState.Visited
 
-        if pos == self.start_point:
+        if self.sources[pos]:
             return CellState.Start
-        if pos == self.end_point:
+        if self.goals[pos]:
             return CellState.End
 
         return CellState.from_color(self.grid[pos])
 
+    def is_visited(self, pos: tuple[int, int]) -> bool:
+        """whether pos was visited by the current search, parents of other cells are stale"""
+        return self.neighborhood.is_visited(pos)
+
+    def source_points(self) -> list[tuple[int, int]]:
+        return [(int(x), int(y)) for x, y in np.argwhere(self.sources)]
+
+    def goal_points(self) -> list[tuple[int, int]]:
+        return [(int(x), int(y)) for x, y in np.argwhere(self.goals)]
+
     def is_ready(self) -> bool:
-        return self.start_point is not None and self.end_point is not None
+        return bool(self.sources.any() and self.goals.any())
 
     def init_queue(self):
+        """seed every source at once, each one is its own parent"""
         self.bfs_queue.clear()
-        if not self.start_point:
+        sources = self.source_points()
+        if not sources:
             raise ValueError("Start point not set")
-        self.bfs_queue.append(self.start_point)
-        self.parents[self.start_point] = self.start_point
-        self.glows[self.start_point] = GLOW_FADE_DURATION
+        self.bfs_queue.extend(sources)
+        self.search_heap = [(0, 0, source) for source in sources]
+        for source in sources:
+            self.parents[source] = source
+            self.costs[source] = 0
+            self.neighborhood.visit(source)
+            self.glows[source] = GLOW_FADE_DURATION
 
     def reset_path(self):
         self.found_path = None
         self.path_render_iter = 0
-        self.parents.fill(int(-1))
+        self.neighborhood.reset_visited()
 
     def render_grid_rect(
         self,
@@ -223,21 +315,20 @@ class Grid(Renderable):
         return np.ndindex(self.grid_shape())
 
     def render_base(self, screen: pygame.Surface):
-        for pos in self.grid_indexer():
-            color = self.grid[pos]
-            self.render_grid_rect(screen, pos, color)
+        # one pixel per cell scaled up, the same squares render_grid_rect would draw
+        cells = pygame.surfarray.make_surface(self.grid[..., :3])
+        size = (self.grid_width * self.scale, self.grid_height * self.scale)
+        screen.blit(pygame.transform.scale(cells, size), self.bounding_box.topleft)
 
     def render_visited(self, screen: pygame.Surface):
-        for pos in self.grid_indexer():
-            if pos in [self.start_point, self.end_point] or self.parents[pos][0] == -1:
-                continue
+        visited = self.neighborhood.visited_mask() & ~(self.sources | self.goals)
+        for pos in map(tuple, np.argwhere(visited).tolist()):
             self.render_grid_rect(screen, pos, VISITED_COLOR)
 
     def render_arrows(self, screen: pygame.Surface):
-        for pos in self.grid_indexer():
+        visited = self.neighborhood.visited_mask()
+        for pos in map(tuple, np.argwhere(visited).tolist()):
             parent_pos = self.parents[pos]
-            if parent_pos[0] == -1:
-                continue
             parent_screen_pos = self.grid_to_screen(parent_pos)
             child_screen_pos = self.grid_to_screen(pos)
             draw_arrow(screen, ARROW_COLOR, parent_screen_pos, child_screen_pos)
@@ -249,15 +340,13 @@ class Grid(Renderable):
         self.path_render_iter = min(self.path_render_iter + 1, len(self.found_path))
         for i in range(self.path_render_iter):
             pos = self.found_path[i]
-            if pos in [self.start_point, self.end_point]:
+            if self.sources[pos] or self.goals[pos]:
                 continue
             self.render_grid_rect(screen, pos, WALKED_COLOR)
 
     def render_glows(self, screen: pygame.Surface):
-        for pos in self.grid_indexer():
+        for pos in map(tuple, np.argwhere(self.glows >= 0.001).tolist()):
             glow_time = self.glows[pos]
-            if glow_time < 0.001:
-                continue
             lerp_percent = pygame.math.clamp(glow_time / GLOW_FADE_DURATION, 0, 1)
             curved_percent = glow_sample_curve(lerp_percent)
             glow_scalar = pygame.math.lerp(
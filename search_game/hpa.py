@@ -0,0 +1,386 @@
+import heapq
+from collections import defaultdict
+from typing import Optional
+from weakref import WeakKeyDictionary, WeakMethod, ref
+
+import numpy as np
+import pygame
+
+from search_game.constants import HPA_CLUSTER_SIZE, MAX_HEURISTIC_GOALS
+from search_game.grid import Grid, Path
+
+UNREACHABLE = -1
+NEIGHBOR_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+def cluster_distances(walkable: np.ndarray, sources: list[tuple[int, int]]):
+    """breadth-first distances from every source at once inside one cluster
+
+    Parameters
+    ----------
+    walkable : np.ndarray
+        boolean mask of the walkable cells of the cluster
+    sources : list[tuple[int, int]]
+        positions local to the cluster to start from
+
+    Returns
+    -------
+    np.ndarray
+        (len(sources), width, height) distances, UNREACHABLE where no path exists
+    """
+
+    distances = np.full((len(sources), *walkable.shape), UNREACHABLE, dtype=np.int32)
+    frontier = np.zeros(distances.shape, dtype=bool)
+    for i, source in enumerate(sources):
+        frontier[(i, *source)] = True
+    reached = frontier.copy()
+
+    level = 0
+    while frontier.any():
+        distances[frontier] = level
+        level += 1
+        expanded = np.zeros_like(frontier)
+        expanded[:, 1:, :] |= frontier[:, :-1, :]
+        expanded[:, :-1, :] |= frontier[:, 1:, :]
+        expanded[:, :, 1:] |= frontier[:, :, :-1]
+        expanded[:, :, :-1] |= frontier[:, :, 1:]
+        frontier = expanded & walkable & ~reached
+        reached |= frontier
+    return distances
+
+
+def border_segments(both_open: np.ndarray) -> list[int]:
+    """middle index of every run of True in both_open"""
+    padded = np.concatenate(([False], both_open, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    starts, ends = edges[0::2], edges[1::2]
+    return list((starts + ends - 1) // 2)
+
+
+class Cluster:
+    rect: pygame.Rect  # in grid units
+    nodes: list[tuple[int, int]]  # entrance cells on the border of the cluster
+    edges: dict[tuple[int, int], list[tuple[tuple[int, int], int]]]
+
+    def __init__(self, rect: pygame.Rect):
+        self.rect = rect
+        self.nodes = []
+        self.edges = {}
+
+    def to_local(self, pos: tuple[int, int]) -> tuple[int, int]:
+        return (pos[0] - self.rect.left, pos[1] - self.rect.top)
+
+    def to_global(self, pos) -> tuple[int, int]:
+        return (int(pos[0]) + self.rect.left, int(pos[1]) + self.rect.top)
+
+    def find_entrances(
+        self, grid: Grid
+    ) -> list[tuple[tuple[int, int], tuple[int, int]]]:
+        """entrance cells where the cluster connects to its neighbors
+
+        every run of open cells along a shared border gets one entrance in its middle,
+        both clusters of the border pick the same run so the entrances mirror each other
+
+        Returns
+        -------
+        list[tuple[tuple[int, int], tuple[int, int]]]
+            pairs of (entrance, the mirrored entrance across the border)
+        """
+        rect = self.rect
+        entrances = []
+        borders = [
+            (rect.left, rect.left - 1, True),
+            (rect.right - 1, rect.right, True),
+            (rect.top, rect.top - 1, False),
+            (rect.bottom - 1, rect.bottom, False),
+        ]
+        for inside, outside, vertical in borders:
+            if vertical:
+                if not 0 <= outside < grid.grid_width:
+                    continue
+                inner = pygame.Rect(inside, rect.top, 1, rect.height)
+                outer = pygame.Rect(outside, rect.top, 1, rect.height)
+            else:
+                if not 0 <= outside < grid.grid_height:
+                    continue
+                inner = pygame.Rect(rect.left, inside, rect.width, 1)
+                outer = pygame.Rect(rect.left, outside, rect.width, 1)
+            both_open = (grid.walkable_mask(inner) & grid.walkable_mask(outer)).ravel()
+            for offset in border_segments(both_open):
+                if vertical:
+                    y = rect.top + int(offset)
+                    entrances.append(((inside, y), (outside, y)))
+                else:
+                    x = rect.left + int(offset)
+                    entrances.append(((x, inside), (x, outside)))
+        return entrances
+
+    def rebuild(self, grid: Grid):
+        """recompute the entrances and the abstract edges leaving them"""
+        entrances = self.find_entrances(grid)
+        self.nodes = list(dict.fromkeys(node for node, _ in entrances))
+        self.edges = {node: [] for node in self.nodes}
+        for node, across in entrances:
+            self.edges[node].append((across, 1))
+        if not self.nodes:
+            return
+
+        walkable = grid.walkable_mask(self.rect)
+        local_nodes = [self.to_local(node) for node in self.nodes]
+        distance_maps = cluster_distances(walkable, local_nodes)
+        xs, ys = zip(*local_nodes)
+        distances = distance_maps[:, xs, ys].tolist()
+        for node, row in zip(self.nodes, distances):
+            for other, distance in zip(self.nodes, row):
+                if other != node and distance != UNREACHABLE:
+                    self.edges[node].append((other, distance))
+
+    def distances_from(self, grid: Grid, pos: tuple[int, int]) -> np.ndarray:
+        """distance map of the whole cluster from pos (in grid units)"""
+        walkable = grid.walkable_mask(self.rect)
+        return cluster_distances(walkable, [self.to_local(pos)])[0]
+
+    def refine(
+        self, grid: Grid, from_pos: tuple[int, int], to_pos: tuple[int, int]
+    ) -> Path:
+        """cell path from from_pos to to_pos that stays inside the cluster, excluding from_pos"""
+        distances = self.distances_from(grid, to_pos)
+        local = self.to_local(from_pos)
+        if distances[local] == UNREACHABLE:
+            raise ValueError(f"No path from {from_pos} to {to_pos} in {self.rect}")
+        path = []
+        while distances[local] != 0:
+            for dx, dy in NEIGHBOR_OFFSETS:
+                step = (local[0] + dx, local[1] + dy)
+                if not (
+                    0 <= step[0] < self.rect.width and 0 <= step[1] < self.rect.height
+                ):
+                    continue
+                if distances[step] == distances[local] - 1:
+                    local = step
+                    break
+            path.append(self.to_global(local))
+        return path
+
+
+class ClusterAbstraction:
+    """hierarchical view of a grid split into fixed size clusters
+
+    entrances and intra cluster distances are cached per cluster and only
+    rebuilt for clusters touched by an edit since the last query
+
+    the grid and its edit listener only hold it weakly, the abstraction is cached in
+    a WeakKeyDictionary keyed by the grid and must not keep its key alive
+    """
+
+    grid_ref: ref[Grid]
+    cluster_size: int
+    clusters: dict[tuple[int, int], Cluster]
+    dirty: set[tuple[int, int]]
+
+    def __init__(self, grid: Grid, cluster_size: int = HPA_CLUSTER_SIZE):
+        self.grid_ref = ref(grid)
+        self.cluster_size = cluster_size
+        self.clusters = {}
+        for cx in range(0, grid.grid_width, cluster_size):
+            for cy in range(0, grid.grid_height, cluster_size):
+                rect = pygame.Rect(cx, cy, cluster_size, cluster_size)
+                rect = rect.clip(pygame.Rect(0, 0, grid.grid_width, grid.grid_height))
+                self.clusters[self.cluster_key((cx, cy))] = Cluster(rect)
+        self.dirty = set(self.clusters)
+        invalidate = WeakMethod(self.invalidate)
+
+        def listener(rect: pygame.Rect):
+            method = invalidate()
+            if method is not None:
+                method(rect)
+
+        grid.edit_listeners.append(listener)
+
+    @property
+    def grid(self) -> Grid:
+        return self.grid_ref()
+
+    def cluster_key(self, pos: tuple[int, int]) -> tuple[int, int]:
+        return (pos[0] // self.cluster_size, pos[1] // self.cluster_size)
+
+    def cluster_at(self, pos: tuple[int, int]) -> Cluster:
+        return self.clusters[self.cluster_key(pos)]
+
+    def invalidate(self, rect: pygame.Rect):
+        """mark the clusters overlapping rect dirty
+
+        rect is grown by one cell since a border cell also changes the entrances of the
+        cluster on the other side of the border
+        """
+        touched = rect.inflate(2, 2)
+        first = self.cluster_key((max(touched.left, 0), max(touched.top, 0)))
+        last = self.cluster_key(
+            (
+                min(touched.right - 1, self.grid.grid_width - 1),
+                min(touched.bottom - 1, self.grid.grid_height - 1),
+            )
+        )
+        for cx in range(first[0], last[0] + 1):
+            for cy in range(first[1], last[1] + 1):
+                self.dirty.add((cx, cy))
+
+    def refresh(self):
+        for key in self.dirty:
+            self.clusters[key].rebuild(self.grid)
+        self.dirty.clear()
+
+    def abstract_edges(
+        self, node: tuple[int, int]
+    ) -> list[tuple[tuple[int, int], int]]:
+        """(neighbor, cost) pairs of an entrance node in the abstract graph"""
+        return self.cluster_at(node).edges[node]
+
+    def endpoint_edges(self, pos: tuple[int, int]) -> dict[tuple[int, int], int]:
+        """distances from pos to every entrance node of its cluster that it can reach"""
+        cluster = self.cluster_at(pos)
+        if not cluster.nodes:
+            return {}
+        distances = cluster.distances_from(self.grid, pos)
+        edges = {}
+        for node in cluster.nodes:
+            distance = distances[cluster.to_local(node)]
+            if distance != UNREACHABLE:
+                edges[node] = int(distance)
+        return edges
+
+    def abstract_path(
+        self, starts: list[tuple[int, int]], goals: list[tuple[int, int]]
+    ) -> Optional[Path]:
+        """A* over the entrance graph from every start at once
+
+        Returns
+        -------
+        Optional[Path]
+            the waypoints from a start to the first goal reached, None if unreachable
+        """
+        goal_set = set(goals)
+        start_edges = {start: self.endpoint_edges(start) for start in starts}
+        goal_edges: dict[tuple[int, int], list[tuple[tuple[int, int], int]]] = (
+            defaultdict(list)
+        )
+        for goal in goals:
+            for node, distance in self.endpoint_edges(goal).items():
+                goal_edges[node].append((goal, distance))
+        # a start and a goal sharing a cluster may connect without leaving it
+        for start, edges in start_edges.items():
+            cluster = self.cluster_at(start)
+            local_goals = [goal for goal in goals if self.cluster_at(goal) is cluster]
+            if not local_goals:
+                continue
+            distances = cluster.distances_from(self.grid, start)
+            for goal in local_goals:
+                direct = distances[cluster.to_local(goal)]
+                if direct != UNREACHABLE:
+                    edges[goal] = int(direct)
+
+        def heuristic(pos: tuple[int, int]) -> int:
+            if len(goals) > MAX_HEURISTIC_GOALS:
+                return 0
+            return min(abs(pos[0] - goal[0]) + abs(pos[1] - goal[1]) for goal in goals)
+
+        costs = {start: 0 for start in starts}
+        parents = {start: start for start in starts}
+        open_heap = [(heuristic(start), 0, start) for start in starts]
+        heapq.heapify(open_heap)
+        while open_heap:
+            _, cost, node = heapq.heappop(open_heap)
+            if cost > costs[node]:
+                continue
+            if node in goal_set:
+                waypoints = [node]
+                while parents[waypoints[-1]] != waypoints[-1]:
+                    waypoints.append(parents[waypoints[-1]])
+                return waypoints[::-1]
+
+            edges = []
+            if node in start_edges:
+                edges.extend(start_edges[node].items())
+            if node in self.cluster_at(node).edges:
+                edges.extend(self.abstract_edges(node))
+            if node in goal_edges:
+                edges.extend(goal_edges[node])
+            for neighbor, edge_cost in edges:
+                neighbor_cost = cost + edge_cost
+                if neighbor_cost < costs.get(neighbor, neighbor_cost + 1):
+                    costs[neighbor] = neighbor_cost
+                    parents[neighbor] = node
+                    heapq.heappush(
+                        open_heap,
+                        (neighbor_cost + heuristic(neighbor), neighbor_cost, neighbor),
+                    )
+        return None
+
+    def find_path(
+        self, starts: list[tuple[int, int]], goals: list[tuple[int, int]]
+    ) -> Optional[Path]:
+        """approximate shortest path from any start to the nearest goal
+
+        the path is refined only inside the clusters it crosses and always runs
+        through the entrances between them, so it can be longer than the true shortest
+        path, most of all when start and goal sit close together in different clusters
+
+        Returns
+        -------
+        Optional[Path]
+            the path from the end to the start like bfs_isaac.trace_path, None if unreachable
+        """
+        self.refresh()
+        waypoints = self.abstract_path(starts, goals)
+        if waypoints is None:
+            return None
+
+        cells = [waypoints[0]]
+        for from_pos, to_pos in zip(waypoints, waypoints[1:]):
+            if abs(from_pos[0] - to_pos[0]) + abs(from_pos[1] - to_pos[1]) == 1:
+                cells.append(to_pos)
+                continue
+            cells.extend(self.cluster_at(from_pos).refine(self.grid, from_pos, to_pos))
+        return cells[::-1]
+
+
+_abstractions: WeakKeyDictionary[Grid, ClusterAbstraction] = WeakKeyDictionary()
+
+
+def cluster_abstraction(grid: Grid) -> ClusterAbstraction:
+    """the cached abstraction of grid, created on first use"""
+    if grid not in _abstractions:
+        _abstractions[grid] = ClusterAbstraction(grid)
+    return _abstractions[grid]
+
+
+def hpa_star(grid: Grid) -> Optional[Path]:
+    """hierarchical pathfinding, solves the whole search in a single call
+
+    the path is approximate (see ClusterAbstraction.find_path) and always
+    4-connected, grid.connectivity is ignored
+
+    Parameters
+    ----------
+    grid : Grid
+        grid that contains state of the grid, grid.bfs_queue must hold the starts
+        (see grid.init_queue) and is emptied so later calls do nothing
+
+    Returns
+    -------
+    Optional[Path]
+        the path from the end to the start, None if there is none or the search already ran
+    """
+    goals = grid.goal_points()
+    if len(grid.bfs_queue) == 0 or not goals:
+        return None
+    starts = list(grid.bfs_queue)
+    grid.bfs_queue.clear()
+
+    path = cluster_abstraction(grid).find_path(starts, goals)
+    if path is None:
+        return None
+    for child, parent in zip(path, path[1:]):
+        grid.parents[child] = parent
+        grid.neighborhood.visit(child)
+    return path
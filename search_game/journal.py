@@ -0,0 +1,96 @@
+from typing import Optional
+
+import numpy as np
+
+
+class Stroke:
+    """the cells one stroke changed as sparse arrays sorted by cell
+
+    only the pixel word before the first and after the last edit of each cell is kept,
+    cells that ended up unchanged are dropped
+    """
+
+    cells: np.ndarray  # flat cell indices, sorted and unique
+    before: np.ndarray  # pixel word of each cell before the stroke
+    after: np.ndarray  # pixel word of each cell after the stroke
+
+    def __init__(self, cells: np.ndarray, before: np.ndarray, after: np.ndarray):
+        order = np.argsort(cells, kind="stable")
+        cells, before, after = cells[order], before[order], after[order]
+        new_cell = np.ones(len(cells) + 1, dtype=bool)
+        new_cell[1:-1] = cells[1:] != cells[:-1]
+        first, last = new_cell[:-1], new_cell[1:]
+        before, after = before[first], after[last]
+        changed = before != after
+        self.cells = cells[first][changed]
+        self.before = before[changed]
+        self.after = after[changed]
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+
+class EditJournal:
+    """undo and redo history of the edits to a grid, one entry per stroke
+
+    edits are recorded as the changed cells with their old and new pixel words, and
+    grouped into a stroke until commit, so memory grows with the cells actually
+    edited and never with the size of the map
+    """
+
+    pending: list[tuple[np.ndarray, np.ndarray, np.ndarray]]  # edits of the stroke
+    undo_stack: list[Stroke]
+    redo_stack: list[Stroke]
+
+    def __init__(self):
+        self.pending = []
+        self.undo_stack = []
+        self.redo_stack = []
+
+    def record(self, cells: np.ndarray, before: np.ndarray, after: np.ndarray):
+        """add an edit of the flat cells to the current stroke"""
+        if len(cells):
+            self.pending.append((cells, before, after))
+
+    def commit(self):
+        """close the current stroke, does nothing if nothing was edited since the last"""
+        if not self.pending:
+            return
+        cells, before, after = map(np.concatenate, zip(*self.pending))
+        self.pending = []
+        stroke = Stroke(cells, before, after)
+        if not len(stroke):
+            return
+        self.undo_stack.append(stroke)
+        self.redo_stack.clear()
+
+    def undo(self) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """take back the last stroke, an unfinished one is committed first
+
+        Returns
+        -------
+        Optional[tuple[np.ndarray, np.ndarray]]
+            the cells and the words to write back into them, None if there is nothing
+            to undo
+        """
+        self.commit()
+        if not self.undo_stack:
+            return None
+        stroke = self.undo_stack.pop()
+        self.redo_stack.append(stroke)
+        return stroke.cells, stroke.before
+
+    def redo(self) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """apply the last undone stroke again
+
+        Returns
+        -------
+        Optional[tuple[np.ndarray, np.ndarray]]
+            the cells and the words to write into them, None if there is nothing to redo
+        """
+        self.commit()
+        if not self.redo_stack:
+            return None
+        stroke = self.redo_stack.pop()
+        self.undo_stack.append(stroke)
+        return stroke.cells, stroke.after
@@ -0,0 +1,224 @@
+import heapq
+from typing import Optional
+from weakref import WeakKeyDictionary
+
+import numpy as np
+
+from search_game.constants import GLOW_FADE_DURATION, MAX_HEURISTIC_GOALS
+from search_game.grid import Grid, Path
+from search_game.neighborhood import WALKABLE
+
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+def sign(value: int) -> int:
+    return (value > 0) - (value < 0)
+
+
+def manhattan(a: tuple[int, int], b: tuple[int, int]) -> int:
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+class JumpLayers:
+    """walkable layer and precomputed scan stops for 4-connected jump point search
+
+    every array is padded by a ring of walls like grid.neighborhood so scans never need
+    a bounds check, padded positions are grid positions shifted by one
+
+    canonical paths move vertically first, so a horizontal scan only stops at a goal,
+    a wall or a forced neighbor (a cell above or below that opens up right after a wall)
+    while a vertical scan also stops wherever a horizontal scan would find a jump point
+    """
+
+    revision: int  # grid.revision the layers were built from
+    goals: list[tuple[int, int]]
+    walkable: np.ndarray  # (width + 2, height + 2)
+    row_stops: dict[int, np.ndarray]  # dx -> (height + 2, width + 2) horizontal stops
+    column_stops: np.ndarray  # (width + 2, height + 2) vertical stops
+
+    def __init__(self, grid: Grid):
+        self.revision = grid.revision
+        self.goals = grid.goal_points()
+        walkable = (grid.neighborhood.flags & WALKABLE).astype(bool)
+        goal = np.zeros_like(walkable)
+        goal[1:-1, 1:-1] = grid.goals
+
+        above = np.roll(walkable, 1, axis=1)
+        below = np.roll(walkable, -1, axis=1)
+        column_stops = ~walkable | goal
+        self.row_stops = {}
+        for dx in (-1, 1):
+            behind_above = np.roll(above, dx, axis=0)
+            behind_below = np.roll(below, dx, axis=0)
+            forced = walkable & ((above & ~behind_above) | (below & ~behind_below))
+            stops = ~walkable | forced | goal
+            self.row_stops[dx] = np.ascontiguousarray(stops.T)
+            column_stops |= self.row_scan_hits(walkable, stops, dx)
+        self.walkable = walkable
+        self.column_stops = column_stops
+
+    @staticmethod
+    def row_scan_hits(walkable: np.ndarray, stops: np.ndarray, dx: int) -> np.ndarray:
+        """mask of the cells from which a horizontal scan in dx ends on a jump point"""
+        width = walkable.shape[0]
+        xs = np.arange(width)[:, None]
+        hits = np.zeros_like(walkable)
+        if dx > 0:
+            stop_xs = np.where(stops, xs, width - 1)
+            next_stop = np.minimum.accumulate(stop_xs[::-1], axis=0)[::-1]
+            hits[:-1] = np.take_along_axis(walkable, next_stop[1:], axis=0)
+        else:
+            stop_xs = np.where(stops, xs, 0)
+            next_stop = np.maximum.accumulate(stop_xs, axis=0)
+            hits[1:] = np.take_along_axis(walkable, next_stop[:-1], axis=0)
+        return hits
+
+    def heuristic(self, pos: tuple[int, int]) -> int:
+        """manhattan distance to the closest goal, 0 when there are too many goals"""
+        if len(self.goals) > MAX_HEURISTIC_GOALS:
+            return 0
+        return min((manhattan(pos, goal) for goal in self.goals), default=0)
+
+    def is_walkable(self, pos: tuple[int, int]) -> bool:
+        return bool(self.walkable[pos[0] + 1, pos[1] + 1])
+
+    def jump(
+        self, pos: tuple[int, int], direction: tuple[int, int]
+    ) -> Optional[tuple[int, int]]:
+        """next jump point from pos in direction, None if the scan runs into a wall"""
+        x, y = pos[0] + 1, pos[1] + 1
+        dx, dy = direction
+        if dx != 0:
+            stops = self.row_stops[dx][y]
+            if dx > 0:
+                x = x + 1 + int(np.argmax(stops[x + 1 :]))
+            else:
+                x = x - 1 - int(np.argmax(stops[:x][::-1]))
+        else:
+            stops = self.column_stops[x]
+            if dy > 0:
+                y = y + 1 + int(np.argmax(stops[y + 1 :]))
+            else:
+                y = y - 1 - int(np.argmax(stops[:y][::-1]))
+        if not self.walkable[x, y]:
+            return None
+        return (x - 1, y - 1)
+
+    def pruned_directions(
+        self, pos: tuple[int, int], parent_pos: tuple[int, int]
+    ) -> list[tuple[int, int]]:
+        """directions worth scanning from pos when it was reached from parent_pos"""
+        if pos == parent_pos:
+            return DIRECTIONS
+        dx = sign(pos[0] - parent_pos[0])
+        dy = sign(pos[1] - parent_pos[1])
+        if dx == 0:
+            return [(0, dy), (-1, 0), (1, 0)]
+
+        directions = [(dx, 0)]
+        for side in (-1, 1):
+            if self.is_walkable((pos[0], pos[1] + side)) and not self.is_walkable(
+                (pos[0] - dx, pos[1] + side)
+            ):
+                directions.append((0, side))
+        return directions
+
+
+_layers: WeakKeyDictionary[Grid, JumpLayers] = WeakKeyDictionary()
+
+
+def jump_layers(grid: Grid) -> JumpLayers:
+    """the cached layers of grid, rebuilt only after an edit"""
+    layers = _layers.get(grid)
+    if layers is None or layers.revision != grid.revision:
+        layers = JumpLayers(grid)
+        _layers[grid] = layers
+    return layers
+
+
+def trace_path(grid: Grid, end_pos: tuple[int, int]) -> Path:
+    """trace the path from the end back to a start, filling in the cells between jump points
+
+    Parameters
+    ----------
+    grid : Grid
+        grid whose parents link every jump point to the previous one
+    end_pos : tuple[int, int]
+        the position of the end point
+
+    Returns
+    -------
+    Path
+        the path from the end to the start as a list of positions
+    """
+
+    path = [end_pos]
+    target = end_pos
+    # walk cell by cell so a start lying on a jump link also ends the path
+    while not grid.sources[path[-1]]:
+        pos = path[-1]
+        if pos == target:
+            target = tuple(int(i) for i in grid.parents[pos])
+        path.append(
+            (pos[0] + sign(target[0] - pos[0]), pos[1] + sign(target[1] - pos[1]))
+        )
+    return path
+
+
+def visit_jump_point(grid: Grid, parent_pos, visited_pos, cost: int) -> bool:
+    """link a jump point to its parent unless it was already reached as cheaply
+
+    Returns
+    -------
+    bool
+        whether the jump point was (re)visited and should be pushed on the heap
+    """
+
+    if grid.is_visited(visited_pos) and grid.costs[visited_pos] <= cost:
+        return False
+    grid.parents[visited_pos] = parent_pos
+    grid.costs[visited_pos] = cost
+    grid.glows[visited_pos] = GLOW_FADE_DURATION
+    grid.neighborhood.visit(visited_pos)
+    return True
+
+
+def jps(grid: Grid) -> Optional[Path]:
+    """jump point search only expands one jump point per call!
+
+    Parameters
+    ----------
+    grid : Grid
+        grid that contains state of the grid
+        grid.search_heap is the open list seeded with every start by grid.init_queue,
+        the search stops at the first end popped from it
+
+    Returns
+    -------
+    Optional[Path]
+        if a path is found on this step, return the path as a list of coordinates using trace_path
+        otherwise return None (including if no step can be made)
+    """
+    while grid.search_heap:
+        _, cost, pos = heapq.heappop(grid.search_heap)
+        if cost <= grid.costs[pos]:
+            break
+    else:
+        return None
+
+    if grid.goals[pos]:
+        return trace_path(grid, pos)
+
+    parent_pos = tuple(int(i) for i in grid.parents[pos])
+    layers = jump_layers(grid)
+    for direction in layers.pruned_directions(pos, parent_pos):
+        jump_point = layers.jump(pos, direction)
+        if jump_point is None:
+            continue
+        jump_cost = cost + manhattan(pos, jump_point)
+        if not visit_jump_point(grid, pos, jump_point, jump_cost):
+            continue
+        estimate = jump_cost + layers.heuristic(jump_point)
+        heapq.heappush(grid.search_heap, (estimate, jump_cost, jump_point))
+
+    return None
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from search_game.mapgen import add_map_arguments, load_grid
+from search_game.server import (
+    add_address_arguments,
+    encode_request,
+    read_response,
+)
+
+
+async def run_connection(
+    args: argparse.Namespace,
+    queries: list[tuple[tuple[int, int], tuple[int, int]]],
+    latencies: list[float],
+) -> int:
+    """send queries over one persistent connection keeping args.inflight outstanding
+
+    Returns
+    -------
+    int
+        how many of the queries got a path back
+    """
+
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    slots = asyncio.Semaphore(args.inflight)
+    sent_at: dict[int, float] = {}
+
+    async def send():
+        for query_id, (start, goal) in enumerate(queries):
+            await slots.acquire()
+            sent_at[query_id] = time.perf_counter()
+            writer.write(encode_request(query_id, start, goal))
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    found = 0
+    for _ in queries:
+        query_id, path = await read_response(reader)
+        latencies.append(time.perf_counter() - sent_at.pop(query_id))
+        found += path is not None
+        slots.release()
+    await sender
+    writer.close()
+    await writer.wait_closed()
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="load generator for the path server")
+    add_map_arguments(parser)
+    add_address_arguments(parser)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--inflight", type=int, default=32, help="per connection")
+    parser.add_argument("--queries", type=int, default=1000, help="per connection")
+    parser.add_argument(
+        "--starts", type=int, default=8, help="distinct start cells to draw from"
+    )
+    args = parser.parse_args()
+
+    # queries are drawn from the same map as the server so they hit walkable cells
+    walkable = np.argwhere(load_grid(args).walkable_mask())
+    rng = np.random.default_rng(args.seed)
+    starts = walkable[rng.integers(len(walkable), size=args.starts)]
+    workloads = []
+    for _ in range(args.connections):
+        query_starts = starts[rng.integers(len(starts), size=args.queries)]
+        query_goals = walkable[rng.integers(len(walkable), size=args.queries)]
+        workloads.append(
+            [
+                (tuple(start), tuple(goal))
+                for start, goal in zip(query_starts.tolist(), query_goals.tolist())
+            ]
+        )
+
+    async def run_all():
+        latencies: list[float] = []
+        began = time.perf_counter()
+        found = await asyncio.gather(
+            *(run_connection(args, queries, latencies) for queries in workloads)
+        )
+        return latencies, sum(found), time.perf_counter() - began
+
+    latencies, found, elapsed = asyncio.run(run_all())
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    print(f"queries: {len(latencies)} ({found} with a path) in {elapsed:.2f}s")
+    print(f"throughput: {len(latencies) / elapsed:.0f} queries/s")
+    print(f"latency ms: p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f}")
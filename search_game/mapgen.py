@@ -0,0 +1,254 @@
+import argparse
+import random
+from array import array
+from enum import Enum
+from typing import Callable
+
+import numpy as np
+import pygame
+
+from search_game.constants import END_COLOR, START_COLOR
+from search_game.fill import connected_region
+from search_game.grid import Grid
+
+Shape = tuple[int, int]
+START_END_ATTEMPTS = 32
+
+
+class MapKind(Enum):
+    MAZE = 0
+    OBSTACLES = 1
+    CAVES = 2
+    ROOMS = 3
+
+    def next(self) -> "MapKind":
+        kinds = list(MapKind)
+        return kinds[(kinds.index(self) + 1) % len(kinds)]
+
+
+def maze(shape: Shape, rng: np.random.Generator) -> np.ndarray:
+    """perfect maze carved by a recursive backtracker
+
+    the backtracker itself is inherently sequential, so the loop only records which
+    cell every maze cell was carved from, using plain bytearray/array buffers padded
+    by visited cells (no bounds checks, no numpy scalars), the walls are then knocked
+    down with one vectorized scatter
+
+    Parameters
+    ----------
+    shape : Shape
+        (width, height) of the map in grid units
+    rng : np.random.Generator
+        source of randomness
+
+    Returns
+    -------
+    np.ndarray
+        (width, height) walkable mask
+    """
+
+    walkable = np.zeros(shape, dtype=bool)
+    cells_x, cells_y = (shape[0] - 1) // 2, (shape[1] - 1) // 2
+    if cells_x <= 0 or cells_y <= 0:
+        return walkable
+
+    stride = cells_y + 2
+    visited = bytearray(b"\x01") * ((cells_x + 2) * stride)
+    for x in range(1, cells_x + 1):
+        visited[x * stride + 1 : x * stride + cells_y + 1] = bytes(cells_y)
+    carved_from = array("q", [-1]) * len(visited)
+    random_float = random.Random(int(rng.integers(2**63))).random
+
+    start = (int(rng.integers(cells_x)) + 1) * stride + int(rng.integers(cells_y)) + 1
+    visited[start] = 1
+    carved_from[start] = start
+    stack = [start]
+    while stack:
+        cell = stack[-1]
+        options = []
+        if not visited[cell - stride]:
+            options.append(cell - stride)
+        if not visited[cell + stride]:
+            options.append(cell + stride)
+        if not visited[cell - 1]:
+            options.append(cell - 1)
+        if not visited[cell + 1]:
+            options.append(cell + 1)
+        if not options:
+            stack.pop()
+            continue
+        carved = options[int(random_float() * len(options))]
+        visited[carved] = 1
+        carved_from[carved] = cell
+        stack.append(carved)
+
+    carved_from = np.frombuffer(carved_from, dtype=np.int64)
+    cells = np.flatnonzero(carved_from >= 0)
+    parents = carved_from[cells]
+    cell_x, cell_y = np.divmod(cells, stride)
+    parent_x, parent_y = np.divmod(parents, stride)
+    # padded cell (x, y) sits at map position (2x - 1, 2y - 1)
+    walkable[2 * cell_x - 1, 2 * cell_y - 1] = True
+    walkable[cell_x + parent_x - 1, cell_y + parent_y - 1] = True
+    return walkable
+
+
+def obstacles(
+    shape: Shape, rng: np.random.Generator, density: float = 0.3
+) -> np.ndarray:
+    """independent random walls covering roughly density of the map"""
+    return rng.random(shape) >= density
+
+
+def neighbor_walls(walls: np.ndarray) -> np.ndarray:
+    """count of the walls among the 8 neighbors of every cell, the outside counts as wall"""
+    padded = np.pad(walls, 1, constant_values=True).astype(np.uint8)
+    width, height = walls.shape
+    counts = np.zeros(walls.shape, dtype=np.uint8)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            if dx == 0 and dy == 0:
+                continue
+            counts += padded[1 + dx : 1 + dx + width, 1 + dy : 1 + dy + height]
+    return counts
+
+
+def caves(
+    shape: Shape,
+    rng: np.random.Generator,
+    density: float = 0.45,
+    steps: int = 5,
+) -> np.ndarray:
+    """cellular automaton caves, noise smoothed by the 4-5 rule"""
+    walls = rng.random(shape) < density
+    for _ in range(steps):
+        counts = neighbor_walls(walls)
+        walls = np.where(walls, counts >= 4, counts >= 5)
+    return ~walls
+
+
+def rooms(
+    shape: Shape,
+    rng: np.random.Generator,
+    room_size: tuple[int, int] = (4, 12),
+    area_per_room: int = 400,
+) -> np.ndarray:
+    """random rectangular rooms linked in order by L shaped corridors"""
+    width, height = shape
+    walkable = np.zeros(shape, dtype=bool)
+    count = max(2, width * height // area_per_room)
+    low, high = room_size
+    sizes = rng.integers(low, high + 1, size=(count, 2))
+    sizes = np.minimum(sizes, [max(1, width - 2), max(1, height - 2)])
+    lefts = rng.integers(1, np.maximum(2, width - sizes[:, 0]))
+    tops = rng.integers(1, np.maximum(2, height - sizes[:, 1]))
+    centers_x = np.minimum(lefts + sizes[:, 0] // 2, width - 1)
+    centers_y = np.minimum(tops + sizes[:, 1] // 2, height - 1)
+    bends = rng.random(count) < 0.5
+
+    for left, top, (room_width, room_height) in zip(lefts, tops, sizes):
+        walkable[left : left + room_width, top : top + room_height] = True
+    for i in range(count - 1):
+        x1, y1, x2, y2 = centers_x[i], centers_y[i], centers_x[i + 1], centers_y[i + 1]
+        # the corridor turns either at (x2, y1) or at (x1, y2)
+        corner_x, corner_y = (x2, y1) if bends[i] else (x1, y2)
+        walkable[min(x1, x2) : max(x1, x2) + 1, corner_y] = True
+        walkable[corner_x, min(y1, y2) : max(y1, y2) + 1] = True
+    return walkable
+
+
+GENERATORS: dict[MapKind, Callable[..., np.ndarray]] = {
+    MapKind.MAZE: maze,
+    MapKind.OBSTACLES: obstacles,
+    MapKind.CAVES: caves,
+    MapKind.ROOMS: rooms,
+}
+# generators whose walkable cells always form a single region
+CONNECTED_KINDS = {MapKind.MAZE, MapKind.ROOMS}
+
+
+def pick_start_end(
+    walkable: np.ndarray, rng: np.random.Generator, connected: bool = False
+) -> tuple[tuple[int, int], tuple[int, int]]:
+    """a random start and a random end that can be reached from it
+
+    connected skips the region lookup for maps known to be a single region
+
+    Raises
+    ------
+    ValueError
+        if no two connected walkable cells were found
+    """
+
+    height = walkable.shape[1]
+    candidates = np.flatnonzero(walkable)
+    for _ in range(START_END_ATTEMPTS):
+        if len(candidates) < 2:
+            break
+        start = divmod(int(candidates[rng.integers(len(candidates))]), height)
+        if connected:
+            reachable = candidates
+        else:
+            reachable = np.flatnonzero(connected_region(walkable, start))
+        if len(reachable) < 2:
+            continue
+        end = start
+        while end == start:
+            end = divmod(int(reachable[rng.integers(len(reachable))]), height)
+        return start, end
+    raise ValueError("Map has no two connected walkable cells")
+
+
+def generate(grid: Grid, kind: MapKind, seed: int, **params):
+    """fill grid with a generated map and place a reachable start and end
+
+    Parameters
+    ----------
+    grid : Grid
+        grid to overwrite
+    kind : MapKind
+        which generator to use
+    seed : int
+        seed of the generator, the same seed always gives the same map
+    params
+        extra parameters of the generator (density, steps, ...)
+    """
+
+    rng = np.random.default_rng(seed)
+    walkable = GENERATORS[kind](grid.grid_shape(), rng, **params)
+    grid.set_walkable(walkable)
+    start, end = pick_start_end(walkable, rng, kind in CONNECTED_KINDS)
+    grid.place_square(start, START_COLOR)
+    grid.place_square(end, END_COLOR)
+
+
+def generate_grid(width: int, height: int, kind: MapKind, seed: int, **params) -> Grid:
+    """headless grid of width x height cells (one pixel each) filled by generate"""
+    grid = Grid(scale=1, bounding_box=pygame.Rect(0, 0, width, height))
+    generate(grid, kind, seed, **params)
+    return grid
+
+
+def add_map_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--map", help="walkable mask saved with numpy.save")
+    parser.add_argument(
+        "--kind",
+        choices=[kind.name for kind in MapKind],
+        default=MapKind.OBSTACLES.name,
+        help="generator to use when no --map is given",
+    )
+    parser.add_argument("--size", type=int, nargs=2, default=(1000, 1000))
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def load_grid(args: argparse.Namespace) -> Grid:
+    """headless grid from --map, or generated from --kind, --size and --seed"""
+    if args.map is None:
+        width, height = args.size
+        kind = MapKind[args.kind]
+        return generate_grid(width, height, kind, args.seed)
+    walkable = np.load(args.map).astype(bool)
+    width, height = walkable.shape
+    grid = Grid(scale=1, bounding_box=pygame.Rect(0, 0, width, height))
+    grid.set_walkable(walkable)
+    return grid
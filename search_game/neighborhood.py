@@ -0,0 +1,120 @@
+from enum import Enum
+
+import numpy as np
+import pygame
+
+WALKABLE = np.uint8(1)
+EPOCH_DTYPE = np.uint32
+
+
+class Connectivity(Enum):
+    FOUR = 4
+    EIGHT = 8
+
+    def moves(self) -> list[tuple[int, int]]:
+        straight = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+        if self == Connectivity.FOUR:
+            return straight
+        return straight + [(-1, -1), (1, -1), (-1, 1), (1, 1)]
+
+    def toggled(self) -> "Connectivity":
+        if self == Connectivity.FOUR:
+            return Connectivity.EIGHT
+        return Connectivity.FOUR
+
+
+def offset_table(moves: list[tuple[int, int]], stride: int) -> np.ndarray:
+    """flat offsets of each move and of the two cells its corner cutting check reads
+
+    a straight move checks itself as both corners, which is always true when the
+    move itself is open
+    """
+    table = np.zeros((3, len(moves)), dtype=np.intp)
+    for i, (dx, dy) in enumerate(moves):
+        table[0, i] = dx * stride + dy
+        if dx != 0 and dy != 0:
+            table[1, i] = dx * stride
+            table[2, i] = dy
+        else:
+            table[1, i] = table[2, i] = table[0, i]
+    return table
+
+
+class Neighborhood:
+    """walkable bitmask and visit stamps of a grid with precomputed neighbor tables
+
+    both layers are padded by a ring of closed cells so a neighbor lookup never needs
+    a bounds check, and are read through flat indices so all neighbors of a cell come
+    from a single fancy indexed read per layer
+
+    a cell counts as visited when its stamp equals the current epoch, so starting a
+    new search only bumps the epoch instead of clearing every cell
+
+    diagonal moves may not cut corners, both cells beside the diagonal must be walkable
+    """
+
+    width: int
+    height: int
+    stride: int
+    flags: np.ndarray  # (width + 2, height + 2) WALKABLE bits
+    flat_flags: np.ndarray  # flat view of flags
+    stamps: np.ndarray  # (width + 2, height + 2) epoch each cell was last visited in
+    flat_stamps: np.ndarray  # flat view of stamps
+    epoch: int
+    tables: dict[Connectivity, np.ndarray]  # (3, moves) target, corner, corner offsets
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.stride = height + 2
+        self.flags = np.zeros((width + 2, height + 2), dtype=np.uint8)
+        self.flat_flags = self.flags.reshape(-1)
+        self.stamps = np.zeros((width + 2, height + 2), dtype=EPOCH_DTYPE)
+        self.flat_stamps = self.stamps.reshape(-1)
+        self.epoch = 1
+        self.tables = {
+            connectivity: offset_table(connectivity.moves(), self.stride)
+            for connectivity in Connectivity
+        }
+
+    def to_flat(self, pos: tuple[int, int]) -> int:
+        return (pos[0] + 1) * self.stride + pos[1] + 1
+
+    def to_pos(self, flat: int) -> tuple[int, int]:
+        x, y = divmod(int(flat), self.stride)
+        return (x - 1, y - 1)
+
+    def refresh(self, rect: pygame.Rect, walkable: np.ndarray):
+        """copy the walkable mask of rect (in grid units) into the bitmask"""
+        region = self.flags[
+            rect.left + 1 : rect.right + 1, rect.top + 1 : rect.bottom + 1
+        ]
+        region &= ~WALKABLE
+        region |= walkable.astype(np.uint8) * WALKABLE
+
+    def reset_visited(self):
+        """forget every visit by moving to a new epoch, clearing stamps only on wraparound"""
+        self.epoch += 1
+        if self.epoch > np.iinfo(EPOCH_DTYPE).max:
+            self.stamps.fill(0)
+            self.epoch = 1
+
+    def visit(self, pos: tuple[int, int]):
+        self.flat_stamps[self.to_flat(pos)] = self.epoch
+
+    def is_visited(self, pos: tuple[int, int]) -> bool:
+        return bool(self.flat_stamps[self.to_flat(pos)] == self.epoch)
+
+    def visited_mask(self) -> np.ndarray:
+        """(width, height) mask of the cells visited in the current epoch"""
+        return self.stamps[1:-1, 1:-1] == self.epoch
+
+    def open_neighbors(
+        self, pos: tuple[int, int], connectivity: Connectivity
+    ) -> list[tuple[int, int]]:
+        """walkable and unvisited neighbors of pos"""
+        cells = self.to_flat(pos) + self.tables[connectivity]
+        flags = self.flat_flags[cells]
+        unvisited = self.flat_stamps[cells[0]] != self.epoch
+        valid = unvisited & (flags[0] & flags[1] & flags[2] & WALKABLE).astype(bool)
+        return [self.to_pos(cell) for cell in cells[0][valid]]
@@ -10,7 +10,9 @@ pathfind_ticker = Ticker(PATHFIND_TICK)
 
 clock = pygame.time.Clock()
 pathfind_counter = 0
-# change out the bfs implementation here
+# change out the bfs implementation here, hpa.hpa_star and
+# tiled_wavefront.tiled_bfs solve the whole search in one call,
+# jps.jps expands a jump point per call, jps and hpa_star only move 4-connected
 bfs_implementation = bfs_isaac
 
 
@@ -43,9 +45,22 @@ def pathfind_toggle():
             GLOBAL_STATE.set_gamemode(Gamemode.PLAY, PATHFIND_LOOP)
 
 
+def connectivity_toggle():
+    if GLOBAL_STATE.key_event(pygame.KEYDOWN, pygame.K_d):
+        grid = GLOBAL_STATE.grid
+        grid.connectivity = grid.connectivity.toggled()
+        print("Connectivity:", grid.connectivity.value)
+
+
 def init():
     pass
 
 
-DRAW_LOOP = [draw_grid.create_grid_loop, pathfind_toggle]
+DRAW_LOOP = [
+    draw_grid.create_grid_loop,
+    draw_grid.generate_map_loop,
+    draw_grid.undo_loop,
+    pathfind_toggle,
+    connectivity_toggle,
+]
 PATHFIND_LOOP = [pathfind_update, pathfind_toggle]
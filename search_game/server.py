@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import os
+import stat
+import struct
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from search_game.grid import Grid, Path
+from search_game.mapgen import add_map_arguments, load_grid
+from search_game.wavefront import Wavefront
+
+# request: query id, start x, start y, goal x, goal y
+REQUEST = struct.Struct("<IHHHH")
+# response: query id, number of cells (NO_PATH if unreachable), then that many cells
+RESPONSE = struct.Struct("<Ii")
+CELL = struct.Struct("<HH")
+NO_PATH = -1
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7878
+DEFAULT_BATCH_WINDOW = 0.002  # in seconds
+
+Query = tuple[tuple[int, int], tuple[int, int]]  # (start, goal)
+
+
+def encode_request(query_id: int, start: tuple[int, int], goal: tuple[int, int]):
+    return REQUEST.pack(query_id, *start, *goal)
+
+
+def encode_response(query_id: int, path: Optional[Path]) -> bytes:
+    """the path is sent from the start to the goal"""
+    if path is None:
+        return RESPONSE.pack(query_id, NO_PATH)
+    cells = np.array(path[::-1], dtype="<u2")
+    return RESPONSE.pack(query_id, len(path)) + cells.tobytes()
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple[int, Optional[Path]]:
+    query_id, length = RESPONSE.unpack(await reader.readexactly(RESPONSE.size))
+    if length == NO_PATH:
+        return query_id, None
+    cells = np.frombuffer(await reader.readexactly(length * CELL.size), dtype="<u2")
+    return query_id, [tuple(cell) for cell in cells.reshape(-1, 2).tolist()]
+
+
+class QueryBatcher:
+    """collects the queries arriving within one window and answers them together
+
+    queries are grouped by start, so a single wavefront from each start answers every
+    goal asked for it, searches run on one worker thread to keep the event loop free
+    """
+
+    grid: Grid
+    wavefront: Wavefront
+    window: float
+    pending: list[tuple[Query, asyncio.Future]]
+    executor: ThreadPoolExecutor
+
+    def __init__(self, grid: Grid, window: float = DEFAULT_BATCH_WINDOW):
+        self.grid = grid
+        self.wavefront = Wavefront(grid.neighborhood)
+        self.window = window
+        self.pending = []
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def submit(self, query: Query) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self.pending:
+            loop.call_later(self.window, self.flush)
+        self.pending.append((query, future))
+        return future
+
+    def flush(self):
+        batch, self.pending = self.pending, []
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(
+            self.executor, self.solve, [query for query, _ in batch]
+        )
+        task.add_done_callback(lambda done: self.resolve(batch, done))
+
+    @staticmethod
+    def resolve(batch: list[tuple[Query, asyncio.Future]], done: asyncio.Future):
+        if done.exception() is not None:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(done.exception())
+            return
+        for (_, future), path in zip(batch, done.result()):
+            if not future.done():
+                future.set_result(path)
+
+    def solve(self, queries: list[Query]) -> list[Optional[Path]]:
+        """answer every query, one search per distinct start"""
+        goals_by_start: dict[tuple[int, int], list[tuple[int, int]]] = defaultdict(list)
+        for start, goal in queries:
+            if self.grid.in_bounds(start) and self.grid.in_bounds(goal):
+                goals_by_start[start].append(goal)
+
+        paths: dict[Query, Optional[Path]] = {}
+        for start, goals in goals_by_start.items():
+            self.wavefront.search([start], goals, self.grid.connectivity)
+            for goal in goals:
+                paths[(start, goal)] = self.wavefront.trace_path(goal)
+        return [paths.get(query) for query in queries]
+
+
+async def handle_connection(
+    batcher: QueryBatcher, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+):
+    """serve queries on one persistent connection, answers may come back out of order"""
+
+    async def answer(query_id: int, future: asyncio.Future):
+        writer.write(encode_response(query_id, await future))
+        await writer.drain()
+
+    answers = set()
+    try:
+        while True:
+            request = await reader.readexactly(REQUEST.size)
+            query_id, start_x, start_y, goal_x, goal_y = REQUEST.unpack(request)
+            future = batcher.submit(((start_x, start_y), (goal_x, goal_y)))
+            task = asyncio.create_task(answer(query_id, future))
+            answers.add(task)
+            task.add_done_callback(answers.discard)
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        if answers:
+            await asyncio.gather(*answers, return_exceptions=True)
+        writer.close()
+
+
+def add_address_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--unix", help="unix domain socket path instead of tcp")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+
+def remove_socket(path: str):
+    """delete the unix socket at path, left alone if it is missing or not a socket"""
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+async def serve(grid: Grid, args: argparse.Namespace):
+    batcher = QueryBatcher(grid, args.window / 1000)
+    handler = lambda reader, writer: handle_connection(batcher, reader, writer)
+    if args.unix:
+        # a server that was killed leaves its socket behind and binding would fail
+        remove_socket(args.unix)
+        server = await asyncio.start_unix_server(handler, path=args.unix)
+    else:
+        server = await asyncio.start_server(handler, args.host, args.port)
+    print(
+        f"Serving {grid.grid_width}x{grid.grid_height} grid on", args.unix or args.port
+    )
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if args.unix:
+            remove_socket(args.unix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="headless shortest path server")
+    add_map_arguments(parser)
+    add_address_arguments(parser)
+    parser.add_argument(
+        "--window",
+        type=float,
+        default=DEFAULT_BATCH_WINDOW * 1000,
+        help="batching window in milliseconds",
+    )
+    args = parser.parse_args()
+    grid = load_grid(args)
+    asyncio.run(serve(grid, args))
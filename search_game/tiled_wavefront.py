@@ -0,0 +1,601 @@
+import multiprocessing
+import os
+from math import ceil
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.synchronize import Barrier
+from typing import Optional
+from weakref import WeakKeyDictionary, finalize
+
+import numpy as np
+
+from search_game.grid import Grid, Path
+from search_game.neighborhood import (
+    EPOCH_DTYPE,
+    WALKABLE,
+    Connectivity,
+    Neighborhood,
+    offset_table,
+)
+from search_game.wavefront import UNREACHED
+
+DEFAULT_TILE_SIZE = 256  # in grid units, trades the per tile overhead against balance
+DEFAULT_DEPTH = 32  # bfs levels per round, trades the barriers against redundant work
+TILE_COST = 8  # per round overhead of a busy tile in cells when balancing the work
+SEARCH = 1
+STOP = 2
+LAYER_ALIGNMENT = 8  # in bytes
+OUTSIDE = -1  # owner of the padding ring
+SMALL_KEY_TILES = 1 << 16  # up to here tile indices sort as 16 bit keys
+# band bits of the cells within depth of each side of their tile
+WEST, EAST, NORTH, SOUTH = 1, 2, 4, 8
+DIRECTIONS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)]
+
+
+def facing_classes(dx: int, dy: int) -> int:
+    """set of band bit combinations, as bits of an int, of the cells of a tile within
+    depth of its neighbor at (-dx, -dy), which is the tile at (dx, dy) seen from there
+    """
+    required = (
+        (WEST if dx == 1 else 0)
+        | (EAST if dx == -1 else 0)
+        | (NORTH if dy == 1 else 0)
+        | (SOUTH if dy == -1 else 0)
+    )
+    return sum(1 << bits for bits in range(16) if bits & required == required)
+
+
+FACING = np.array([facing_classes(dx, dy) for dx, dy in DIRECTIONS], dtype=np.uint16)
+EVERY_CLASS = np.uint16(0xFFFF)
+
+
+class SharedLayers:
+    """the arrays shared by the coordinator and the workers, back to back in one block
+
+    the frontier layers are double buffered by round parity, so a worker already
+    writing the next round never races one still reading the last
+    """
+
+    flags: np.ndarray  # flat padded WALKABLE bits of the neighborhood
+    owners: np.ndarray  # flat padded index of the tile each cell belongs to
+    bands: np.ndarray  # flat padded band bits of each cell
+    distances: np.ndarray  # flat padded bfs level of each cell, UNREACHED if not yet
+    parents: np.ndarray  # flat padded index of the parent of each reached cell
+    frontiers: np.ndarray  # (2, cells) frontier of each tile in its slot, flat padded
+    counts: np.ndarray  # (2, tiles + 1) length of the frontier of each tile in a round
+    control: np.ndarray  # (command, connectivity value) for the next wake up
+
+    def __init__(self, buffer: memoryview, size: int, cells: int, tiles: int):
+        offset = 0
+        for name, shape, dtype in SharedLayers.specs(size, cells, tiles):
+            layer = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            setattr(self, name, layer)
+            offset += ceil(layer.nbytes / LAYER_ALIGNMENT) * LAYER_ALIGNMENT
+
+    @staticmethod
+    def specs(size: int, cells: int, tiles: int) -> list[tuple[str, tuple, type]]:
+        # the last count stays 0, it pads the neighbor lists of edge tiles
+        return [
+            ("flags", (size,), np.uint8),
+            ("owners", (size,), np.int32),
+            ("bands", (size,), np.uint8),
+            ("distances", (size,), np.int32),
+            ("parents", (size,), np.int64),
+            ("frontiers", (2, cells), np.uint32),
+            ("counts", (2, tiles + 1), np.int64),
+            ("control", (2,), np.int64),
+        ]
+
+    @staticmethod
+    def nbytes(size: int, cells: int, tiles: int) -> int:
+        return sum(
+            ceil(int(np.prod(shape)) * np.dtype(dtype).itemsize / LAYER_ALIGNMENT)
+            * LAYER_ALIGNMENT
+            for _, shape, dtype in SharedLayers.specs(size, cells, tiles)
+        )
+
+
+class Scratch:
+    """private arrays of a worker, stamped per round so they never need clearing"""
+
+    stamps: np.ndarray  # flat padded round each cell was reached in by this worker
+    claims: np.ndarray  # flat padded parent of each cell reached by this worker
+    stamp: int
+
+    def __init__(self, size: int):
+        self.stamps = np.zeros(size, dtype=EPOCH_DTYPE)
+        self.claims = np.zeros(size, dtype=np.uint32)
+        self.stamp = 0
+
+    def new_stamp(self):
+        self.stamp += 1
+        if self.stamp > np.iinfo(EPOCH_DTYPE).max:
+            self.stamps.fill(0)
+            self.stamp = 1
+
+
+class Tile:
+    """a rectangle of the padded grid, only one worker per round writes its cells"""
+
+    index: int
+    column: int
+    row: int
+    left: int
+    right: int  # exclusive
+    top: int
+    bottom: int  # exclusive
+    slot: int  # start of the frontier of the tile in SharedLayers.frontiers
+
+    def __init__(
+        self,
+        index: int,
+        position: tuple[int, int],
+        bounds: tuple[int, int, int, int],
+        slot: int,
+    ):
+        self.index = index
+        self.column, self.row = position
+        self.left, self.right, self.top, self.bottom = bounds
+        self.slot = slot
+
+
+def tile_layout(width: int, height: int, tile_size: int) -> list[Tile]:
+    """cover the (width, height) grid with tiles of at most tile_size cells a side
+
+    the cells are spread evenly over the columns and rows of tiles, so no tile is much
+    thinner than the others
+    """
+    columns, rows = ceil(width / tile_size), ceil(height / tile_size)
+    tiles = []
+    slot = 0
+    for column in range(columns):
+        for row in range(rows):
+            bounds = (
+                1 + column * width // columns,
+                1 + (column + 1) * width // columns,
+                1 + row * height // rows,
+                1 + (row + 1) * height // rows,
+            )
+            tiles.append(Tile(len(tiles), (column, row), bounds, slot))
+            slot += (bounds[1] - bounds[0]) * (bounds[3] - bounds[2])
+    return tiles
+
+
+def neighbor_table(tiles: list[Tile]) -> np.ndarray:
+    """(tiles, 8) index of the neighbor of each tile in each of DIRECTIONS
+
+    missing neighbors are len(tiles)
+    """
+    positions = {(tile.column, tile.row): tile.index for tile in tiles}
+    table = np.full((len(tiles), len(DIRECTIONS)), len(tiles), dtype=np.int64)
+    for tile in tiles:
+        for i, (dx, dy) in enumerate(DIRECTIONS):
+            neighbor = positions.get((tile.column + dx, tile.row + dy))
+            if neighbor is not None:
+                table[tile.index, i] = neighbor
+    return table
+
+
+def split_work(costs: np.ndarray, workers: int) -> np.ndarray:
+    """worker of each busy tile, cutting the running total of costs into even shares
+
+    a tile goes to the share its middle falls in, so the tiles of a worker stay next
+    to each other and no share is off by more than a single tile
+    """
+    ends = np.cumsum(costs)
+    middles = ends - costs / 2
+    return np.minimum((middles * workers / ends[-1]).astype(np.int64), workers - 1)
+
+
+def runs(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """indices of lengths consecutive slots from each start, the runs back to back"""
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+
+def store_frontiers(
+    layers: SharedLayers,
+    slots: np.ndarray,
+    indices: np.ndarray,
+    cells: np.ndarray,
+    tile_of: np.ndarray,
+    parity: int,
+):
+    """write cells, which lie in the tiles tile_of, as the frontiers of those tiles
+
+    indices has to be sorted and hold every tile in tile_of, the tiles among them
+    without any cells get an empty frontier
+    """
+    # a stable sort of 16 bit keys is a radix sort, several times faster
+    keys = tile_of.astype(np.uint16) if len(slots) <= SMALL_KEY_TILES else tile_of
+    order = np.argsort(keys, kind="stable")
+    counts = np.bincount(tile_of, minlength=len(slots))[indices]
+    layers.frontiers[parity, runs(slots[indices], counts)] = cells[order]
+    layers.counts[parity, indices] = counts
+
+
+def expand_round(
+    layers: SharedLayers,
+    scratch: Scratch,
+    slots: np.ndarray,
+    neighbors: np.ndarray,
+    indices: np.ndarray,
+    table: np.ndarray,
+    level: int,
+    depth: int,
+):
+    """reach the cells of the next depth levels in the tiles at indices
+
+    the levels run on the private scratch, starting from the frontiers of the tiles and
+    of their neighbors, the cells of the neighbors are only followed within depth of
+    the tiles, which covers every path of up to depth moves into them, so the cells
+    of the tiles come out exact while the neighbors are left to their own workers
+    """
+
+    parity = (level // depth) % 2
+    counts = layers.counts[parity]
+    # cells of a tile can be followed if their band bits are in the classes of it
+    classes = np.zeros(len(slots) + 1, dtype=np.uint16)  # last entry is OUTSIDE
+    np.bitwise_or.at(classes, neighbors[indices], FACING)
+    classes[indices] = EVERY_CLASS
+    classes[-1] = 0
+    sources = np.flatnonzero((classes[:-1] != 0) & (counts[:-1] > 0))
+    frontier = layers.frontiers[parity, runs(slots[sources], counts[sources])]
+    frontier = frontier.astype(np.int64)
+    frontier = frontier[
+        ((classes[layers.owners[frontier]] >> layers.bands[frontier]) & 1) != 0
+    ]
+
+    # cells settled before this round hold a level of at most level, UNREACHED and
+    # whatever other workers already wrote this round read as bigger unsigned
+    settled = layers.distances.view(np.uint32)
+    scratch.new_stamp()
+    stamps, claims, stamp = scratch.stamps, scratch.claims, scratch.stamp
+    reached = []
+    for _ in range(depth):
+        if not len(frontier):
+            break
+        # drop the walls first so the later reads only touch open cells
+        cells = frontier[:, None, None] + table[None, :, :]
+        flags = layers.flags[cells]
+        rows, moves = np.nonzero(
+            (flags[:, 0] & flags[:, 1] & flags[:, 2] & WALKABLE) != 0
+        )
+        candidates = cells[rows, 0, moves]
+        candidate_parents = frontier[rows]
+        classes_of = classes[layers.owners[candidates]]
+        open_cells = ((classes_of >> layers.bands[candidates]) & 1) != 0
+        open_cells &= stamps[candidates] != stamp
+        open_cells &= settled[candidates] > level
+        candidates = candidates[open_cells]
+        candidate_parents = candidate_parents[open_cells]
+
+        # a cell reached from several parents keeps whichever write landed last
+        claims[candidates] = candidate_parents
+        claimed = claims[candidates] == candidate_parents
+        frontier = candidates[claimed]
+        stamps[frontier] = stamp
+        reached.append(frontier)
+
+    # only the cells of the tiles themselves are kept
+    lengths = np.array([len(cells) for cells in reached], dtype=np.int64)
+    cells = np.concatenate(reached) if reached else np.zeros(0, dtype=np.int64)
+    levels = np.repeat(np.arange(level + 1, level + 1 + len(reached)), lengths)
+    tile_of = layers.owners[cells]
+    own = classes[tile_of] == EVERY_CLASS
+    cells, levels, tile_of = cells[own], levels[own], tile_of[own]
+    layers.distances[cells] = levels
+    layers.parents[cells] = claims[cells]
+    last = levels == level + depth
+    store_frontiers(layers, slots, indices, cells[last], tile_of[last], 1 - parity)
+
+
+def flood(
+    layers: SharedLayers,
+    scratch: Scratch,
+    slots: np.ndarray,
+    neighbors: np.ndarray,
+    table: np.ndarray,
+    depth: int,
+    workers: int,
+    worker: int,
+    round_barrier: Barrier,
+):
+    """expand the tiles of one worker round by round until no tile has a frontier
+
+    every round the tiles with work, those with a frontier or next to one, are dealt out
+    again by the size of their frontiers, every worker works out the same split from
+    the shared counts, so the load follows the wavefront around the grid without any
+    messages between the workers
+    """
+
+    level = 0
+    while True:
+        parity = (level // depth) % 2
+        counts = layers.counts[parity]
+        busy = (counts[:-1] > 0) | (counts[neighbors] > 0).any(axis=1)
+        # tiles with no work left have their next round cleared by a fixed worker
+        idle = np.flatnonzero(~busy[worker::workers]) * workers + worker
+        layers.counts[1 - parity, idle] = 0
+        busy = np.flatnonzero(busy)
+        if len(busy):
+            owners = split_work(counts[busy] + TILE_COST, workers)
+            mine = busy[owners == worker]
+            if len(mine):
+                expand_round(
+                    layers, scratch, slots, neighbors, mine, table, level, depth
+                )
+        round_barrier.wait()
+        level += depth
+        if not layers.counts[1 - parity].any():
+            return
+
+
+def run_worker(
+    block: SharedMemory,
+    width: int,
+    height: int,
+    tile_size: int,
+    depth: int,
+    workers: int,
+    worker: int,
+    barriers: tuple[Barrier, Barrier, Barrier],
+):
+    """worker process, floods its share of the tiles every time it is woken up"""
+    start, round_barrier, done = barriers
+    stride = height + 2
+    size = (width + 2) * stride
+    tiles = tile_layout(width, height, tile_size)
+    slots = np.array([tile.slot for tile in tiles], dtype=np.int64)
+    neighbors = neighbor_table(tiles)
+    layers = SharedLayers(block.buf, size, width * height, len(tiles))
+    scratch = Scratch(size)
+    tables = {
+        connectivity: offset_table(connectivity.moves(), stride)
+        for connectivity in Connectivity
+    }
+    try:
+        while True:
+            start.wait()
+            if layers.control[0] == STOP:
+                return
+            table = tables[Connectivity(int(layers.control[1]))]
+            flood(
+                layers,
+                scratch,
+                slots,
+                neighbors,
+                table,
+                depth,
+                workers,
+                worker,
+                round_barrier,
+            )
+            done.wait()
+    except BaseException:
+        # release everyone waiting on this worker instead of hanging them
+        for barrier in barriers:
+            barrier.abort()
+        raise
+
+
+class TiledWavefront:
+    """breadth-first search of a whole grid spread over worker processes
+
+    the grid is split into tiles held in shared memory, and the search runs in rounds
+    of depth levels, every round the tiles with work are dealt out to the workers by
+    the size of their frontiers and all meet at a barrier, a worker also follows the
+    cells of neighboring tiles held by other workers within depth of its own, which is
+    all a path into its tiles can cross in a round, but only ever writes its own cells
+
+    the levels match Wavefront and bfs_isaac, the parents form a valid bfs tree but
+    may pick a different parent among equally close ones
+
+    the workers live as long as the object, so close it (or use it as a context
+    manager) when done
+    """
+
+    neighborhood: Neighborhood
+    workers: int
+    tile_size: int
+    depth: int  # levels per round, at most the thinnest tile
+    slots: np.ndarray  # start of the frontier of each tile
+    block: SharedMemory
+    layers: SharedLayers
+    barriers: tuple[Barrier, Barrier, Barrier]  # start, round, done
+    processes: list[multiprocessing.Process]
+
+    def __init__(
+        self,
+        neighborhood: Neighborhood,
+        workers: Optional[int] = None,
+        tile_size: int = DEFAULT_TILE_SIZE,
+        depth: int = DEFAULT_DEPTH,
+    ):
+        """
+        Raises
+        ------
+        ValueError
+            if the padded grid has too many cells to index the frontiers with 32 bits
+        """
+
+        size = neighborhood.flat_flags.size
+        if size > np.iinfo(np.uint32).max:
+            raise ValueError(f"Grid of {size} padded cells is too big to tile")
+        self.neighborhood = neighborhood
+        self.workers = workers or len(os.sched_getaffinity(0))
+        self.tile_size = tile_size
+        tiles = tile_layout(neighborhood.width, neighborhood.height, tile_size)
+        # a round may only reach into the tiles right next to the ones it expands
+        self.depth = min(
+            [depth] + [min(t.right - t.left, t.bottom - t.top) for t in tiles]
+        )
+        self.slots = np.array([tile.slot for tile in tiles], dtype=np.int64)
+        cells = neighborhood.width * neighborhood.height
+        self.block = SharedMemory(
+            create=True, size=SharedLayers.nbytes(size, cells, len(tiles))
+        )
+        self.layers = SharedLayers(self.block.buf, size, cells, len(tiles))
+        self.layers.distances.fill(UNREACHED)
+        owners = self.layers.owners.reshape(-1, neighborhood.stride)
+        bands = self.layers.bands.reshape(-1, neighborhood.stride)
+        owners.fill(OUTSIDE)
+        for tile in tiles:
+            owners[tile.left : tile.right, tile.top : tile.bottom] = tile.index
+            columns = slice(tile.left, tile.right)
+            rows = slice(tile.top, tile.bottom)
+            bands[tile.left : tile.left + self.depth, rows] |= WEST
+            bands[tile.right - self.depth : tile.right, rows] |= EAST
+            bands[columns, tile.top : tile.top + self.depth] |= NORTH
+            bands[columns, tile.bottom - self.depth : tile.bottom] |= SOUTH
+        self.barriers = (
+            multiprocessing.Barrier(self.workers + 1),
+            multiprocessing.Barrier(self.workers),
+            multiprocessing.Barrier(self.workers + 1),
+        )
+        self.processes = [
+            multiprocessing.Process(
+                target=run_worker,
+                args=(
+                    self.block,
+                    neighborhood.width,
+                    neighborhood.height,
+                    tile_size,
+                    self.depth,
+                    self.workers,
+                    worker,
+                    self.barriers,
+                ),
+                daemon=True,
+            )
+            for worker in range(self.workers)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def __enter__(self) -> "TiledWavefront":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """stop the workers and free the shared memory"""
+        if self.layers is None:
+            return
+        self.layers.control[0] = STOP
+        start = self.barriers[0]
+        if not start.broken:
+            start.wait()
+        for process in self.processes:
+            process.join()
+        # the views have to go before the block can be closed
+        self.layers = None
+        self.block.close()
+        self.block.unlink()
+
+    def search(
+        self,
+        sources: list[tuple[int, int]],
+        connectivity: Connectivity = Connectivity.FOUR,
+    ):
+        """flood everything reachable from every source at once
+
+        Raises
+        ------
+        threading.BrokenBarrierError
+            if a worker failed during the search
+        """
+
+        layers = self.layers
+        neighborhood = self.neighborhood
+        layers.flags[:] = neighborhood.flat_flags
+        layers.distances.fill(UNREACHED)
+        frontier = np.array(
+            [neighborhood.to_flat(source) for source in sources], dtype=np.int64
+        )
+        frontier = np.unique(frontier[(layers.flags[frontier] & WALKABLE) != 0])
+        layers.distances[frontier] = 0
+        layers.parents[frontier] = frontier
+        # the sources make up the first frontiers
+        tiles = np.arange(len(self.slots))
+        store_frontiers(layers, self.slots, tiles, frontier, layers.owners[frontier], 0)
+        layers.control[:] = (SEARCH, connectivity.value)
+
+        start, _, done = self.barriers
+        start.wait()
+        done.wait()
+
+    def distance(self, pos: tuple[int, int]) -> int:
+        """bfs distance of pos in the last search, UNREACHED if it was not reached"""
+        return int(self.layers.distances[self.neighborhood.to_flat(pos)])
+
+    def trace_path(self, goal: tuple[int, int]) -> Optional[Path]:
+        """path from goal back to its source like bfs_isaac.trace_path, None if unreached"""
+        flat = self.neighborhood.to_flat(goal)
+        if self.layers.distances[flat] == UNREACHED:
+            return None
+        path = [goal]
+        parent = int(self.layers.parents[flat])
+        while parent != flat:
+            flat = parent
+            path.append(self.neighborhood.to_pos(flat))
+            parent = int(self.layers.parents[flat])
+        return path
+
+    def fill_grid(self, grid: Grid):
+        """copy the last search into grid.parents and grid.costs and mark it visited"""
+        stride = self.neighborhood.stride
+        distances = self.layers.distances.reshape(-1, stride)[1:-1, 1:-1]
+        parents = self.layers.parents.reshape(-1, stride)[1:-1, 1:-1]
+        reached = distances != UNREACHED
+        parent_xs, parent_ys = np.divmod(parents[reached], stride)
+        grid.parents[reached] = np.stack([parent_xs - 1, parent_ys - 1], axis=-1)
+        grid.costs[reached] = distances[reached]
+        grid.neighborhood.reset_visited()
+        grid.neighborhood.stamps[1:-1, 1:-1][reached] = grid.neighborhood.epoch
+
+
+# reused by tiled_bfs for as long as its grid lives
+_shared: WeakKeyDictionary[Grid, TiledWavefront] = WeakKeyDictionary()
+
+
+def shared_wavefront(grid: Grid) -> TiledWavefront:
+    """the workers kept for grid, started on first use and closed once grid is gone"""
+    if grid not in _shared:
+        wavefront = TiledWavefront(grid.neighborhood)
+        finalize(grid, wavefront.close)
+        _shared[grid] = wavefront
+    return _shared[grid]
+
+
+def tiled_bfs(grid: Grid) -> Optional[Path]:
+    """bfs of the whole grid over worker processes, solves the search in a single call
+
+    the workers are started on the first call and kept for the later ones until the
+    grid is garbage collected
+
+    Parameters
+    ----------
+    grid : Grid
+        grid that contains state of the grid, grid.bfs_queue must hold the starts
+        (see grid.init_queue) and is emptied so later calls do nothing
+
+    Returns
+    -------
+    Optional[Path]
+        the path from the closest end to the start, None if there is none or the
+        search already ran
+    """
+    goals = grid.goal_points()
+    if len(grid.bfs_queue) == 0 or not goals:
+        return None
+    starts = list(grid.bfs_queue)
+    grid.bfs_queue.clear()
+
+    wavefront = shared_wavefront(grid)
+    wavefront.search(starts, grid.connectivity)
+    wavefront.fill_grid(grid)
+    reached = [goal for goal in goals if wavefront.distance(goal) != UNREACHED]
+    if not reached:
+        return None
+    return wavefront.trace_path(min(reached, key=wavefront.distance))
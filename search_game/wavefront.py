@@ -0,0 +1,110 @@
+from typing import Optional
+
+import numpy as np
+
+from search_game.grid import Path
+from search_game.neighborhood import EPOCH_DTYPE, WALKABLE, Connectivity, Neighborhood
+
+UNREACHED = -1
+
+
+class Wavefront:
+    """vectorized breadth-first search over the flat tables of a neighborhood
+
+    a whole bfs level is expanded with a handful of array operations instead of one
+    python step per cell, and like the neighborhood its scratch layers are epoch
+    stamped so a new search never clears them
+    """
+
+    neighborhood: Neighborhood
+    stamps: np.ndarray  # flat epoch each padded cell was reached in
+    parents: np.ndarray  # flat index of the parent of each reached cell
+    distances: np.ndarray  # bfs level each cell was reached at
+    epoch: int
+
+    def __init__(self, neighborhood: Neighborhood):
+        self.neighborhood = neighborhood
+        size = neighborhood.flat_flags.size
+        self.stamps = np.zeros(size, dtype=EPOCH_DTYPE)
+        self.parents = np.zeros(size, dtype=np.int64)
+        self.distances = np.zeros(size, dtype=np.int32)
+        self.epoch = 0
+
+    def new_epoch(self):
+        self.epoch += 1
+        if self.epoch > np.iinfo(EPOCH_DTYPE).max:
+            self.stamps.fill(0)
+            self.epoch = 1
+
+    def is_reached(self, flat: int) -> bool:
+        return bool(self.stamps[flat] == self.epoch)
+
+    def search(
+        self,
+        sources: list[tuple[int, int]],
+        goals: Optional[list[tuple[int, int]]] = None,
+        connectivity: Connectivity = Connectivity.FOUR,
+    ):
+        """expand from every source at once until all goals are reached
+
+        Parameters
+        ----------
+        sources : list[tuple[int, int]]
+            cells the search starts from, walls are ignored
+        goals : Optional[list[tuple[int, int]]]
+            stop as soon as all of these were reached, None floods everything reachable
+        connectivity : Connectivity
+            which neighbor table to expand with
+        """
+
+        self.new_epoch()
+        neighborhood = self.neighborhood
+        flat_flags = neighborhood.flat_flags
+        table = neighborhood.tables[connectivity]
+
+        frontier = np.array(
+            [neighborhood.to_flat(source) for source in sources], dtype=np.int64
+        )
+        frontier = np.unique(frontier[(flat_flags[frontier] & WALKABLE) != 0])
+        self.stamps[frontier] = self.epoch
+        self.parents[frontier] = frontier
+        self.distances[frontier] = 0
+        goal_cells = None
+        if goals is not None:
+            goal_cells = np.array(
+                [neighborhood.to_flat(goal) for goal in goals], dtype=np.int64
+            )
+
+        level = 0
+        while len(frontier):
+            if goal_cells is not None and (self.stamps[goal_cells] == self.epoch).all():
+                return
+            level += 1
+            cells = frontier[:, None, None] + table[None, :, :]
+            flags = flat_flags[cells]
+            candidates = cells[:, 0, :]
+            open_cells = (flags[:, 0] & flags[:, 1] & flags[:, 2] & WALKABLE) != 0
+            open_cells &= self.stamps[candidates] != self.epoch
+            candidates = candidates[open_cells]
+            candidate_parents = np.broadcast_to(frontier[:, None], open_cells.shape)
+            candidate_parents = candidate_parents[open_cells]
+
+            # a cell reached from several parents keeps whichever write landed last
+            self.parents[candidates] = candidate_parents
+            claimed = self.parents[candidates] == candidate_parents
+            frontier = candidates[claimed]
+            self.stamps[frontier] = self.epoch
+            self.distances[frontier] = level
+
+    def trace_path(self, goal: tuple[int, int]) -> Optional[Path]:
+        """path from goal back to its source like bfs_isaac.trace_path, None if unreached"""
+        flat = self.neighborhood.to_flat(goal)
+        if not self.is_reached(flat):
+            return None
+        path = [goal]
+        parent = int(self.parents[flat])
+        while parent != flat:
+            flat = parent
+            path.append(self.neighborhood.to_pos(flat))
+            parent = int(self.parents[flat])
+        return path